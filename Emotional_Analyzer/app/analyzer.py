@@ -1,78 +1,390 @@
-from textblob import TextBlob
-from utils import clean_text, download_nltk_data
+import os
+from contextlib import contextmanager, nullcontext
+from backends import backend_class, get_backend
+from cache import ResultCache
+from profiling import Profiler
+from utils import clean_batch, clean_text, download_nltk_data
+
+# Texts are cleaned and scored in blocks of this size, which is also the progress interval
+SCORING_BLOCK_SIZE = 100
+
+# Analyzer owned by a pool worker process, created once by init_worker
+_worker_analyzer = None
+
+def init_worker(backend, cache_size = 0, profile = False):
+    # Pool initializer: runs once in every worker process so the NLTK data and lexicon
+    # are only loaded once per worker
+
+    global _worker_analyzer
+    _worker_analyzer = SentimentAnalyzer(cache_size = cache_size, backend = backend, profile = profile).warm_up()
+
+def analyze_chunk(chunk, keep_text = True):
+    # Scores one chunk of texts inside a worker process
+    # Arguments: chunk (list): Texts to analyze
+    #            keep_text (bool): Whether to send the text columns back
+    # Then returns: BatchResult: Analysis results in the same order as chunk
+
+    return _worker_analyzer._analyze_serial(chunk, keep_text)
+
+def analyze_chunk_counted(chunk, keep_text = True):
+    # Like analyze_chunk, also reporting what the worker counted while scoring the chunk
+    # Then returns: tuple: (BatchResult, rows that took the fast path,
+    #                       the profiler's summary for this chunk or None when profiling is off)
+
+    analyzer = _worker_analyzer
+    fast_path_rows = analyzer.fast_path_rows
+    if analyzer.profiler is not None:
+        analyzer.profiler.reset()
+    part = analyzer._analyze_serial(chunk, keep_text)
+    return part, analyzer.fast_path_rows - fast_path_rows, analyzer.profile_summary()
+
+def classify(polarity):
+    # Maps a polarity score to its (sentiment, confidence) labels
+
+    if polarity > 0.1:
+        return 'positive', 'high' if polarity > 0.5 else 'medium'
+    elif polarity < -0.1:
+        return 'negative', 'high' if polarity < -0.5 else 'medium'
+    return 'neutral', 'low'
+
+def _neutral_result(text, confidence):
+    # Result used for empty or invalid input, and for texts that failed to analyze
+
+    return {
+        'text': text,
+        'cleaned_text': '',
+        'polarity': 0.0,
+        'subjectivity': 0.0,
+        'sentiment': 'neutral',
+        'confidence': confidence
+    }
+
+def _build_result(text, cleaned, polarity, subjectivity):
+    # Assembles the result dict for a scored text
+
+    sentiment, confidence = classify(polarity)
+    return {
+        'text': text,
+        'cleaned_text': cleaned,
+        'polarity': round(float(polarity), 4),
+        'subjectivity': round(float(subjectivity), 4),
+        'sentiment': sentiment,
+        'confidence': confidence
+    }
+
+def _dedupe(texts):
+    # Collapses repeated strings so each distinct text is only scored once
+    # Returns the distinct texts and, for every input, its index into them
+
+    index = {}
+    unique_texts = []
+    positions = []
+    for text in texts:
+        if isinstance(text, str):
+            position = index.get(text)
+            if position is None:
+                position = index[text] = len(unique_texts)
+                unique_texts.append(text)
+        else:
+            # Non-strings are kept as they are, their result echoes the original value
+            position = len(unique_texts)
+            unique_texts.append(text)
+        positions.append(position)
+    return unique_texts, positions
 
 class SentimentAnalyzer:
-    def __init__(self):
-        # Initialize the sentiment analyzer and download the required data
+    def __init__(self, cache_size = 0, backend = "textblob", profile = False, progress = None):
+        # Initialize the sentiment analyzer
+        # NLTK data and the scoring backend are loaded on first use (or by warm_up), so this is cheap
+        # Arguments: cache_size (int): Results kept in the LRU cache, 0 turns the cache off
+        #            backend (str): Scoring backend, "textblob" or the vectorized "lexicon"
+        #            profile (bool): Record per-stage times and counters in self.profiler
+        #            progress (callable): Called as progress(done, total) while a batch runs
+
+        backend_class(backend)
+        self.backend_name = backend
+        self._backend = None
+        self.cache = ResultCache(cache_size) if cache_size else None
+        # Left as None when off, so the hot paths skip profiling altogether
+        self.profiler = Profiler() if profile else None
+        self.progress = progress
+        # Texts scored neutral by the vocabulary screen without calling the backend
+        self.fast_path_rows = 0
+        # Process pool kept open by worker_pool, reused by every parallel analyze_batch inside it
+        self._pool = None
+
+    def warm_up(self):
+        # Downloads the required data and loads the scoring backend now instead of on first use
+        # Returns: SentimentAnalyzer: self, ready to analyze
 
-        download_nltk_data()
+        if self._backend is None:
+            download_nltk_data()
+            self._backend = get_backend(self.backend_name)
+        return self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self.warm_up()
+        return self._backend
+
+    def cache_info(self):
+        # Returns the cache hit/miss counters, or None when caching is off
+
+        return self.cache.stats() if self.cache is not None else None
+
+    @contextmanager
+    def worker_pool(self, workers = None):
+        # Keeps one process pool open for every analyze_batch call made inside the with block
+        # Wrap loops over chunks in it, so the workers load the NLTK data and lexicon once, not once per chunk
+        # Arguments: workers (int): Worker processes, None uses every core; 1 or less keeps scoring here
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or self._pool is not None:
+            yield self
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Processes start on the first parallel batch, a stream of small chunks never starts any
+        self._pool = ProcessPoolExecutor(max_workers = workers, initializer = init_worker,
+                                         initargs = (self.backend_name, 0, self.profiler is not None))
+        try:
+            yield self
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+
+    def profile_summary(self):
+        # Returns the profiler's times and counters, or None when profiling is off
+
+        return self.profiler.summary() if self.profiler is not None else None
+
+    def _timed(self, stage, func, *args):
+        # Calls func(*args), timing it under stage when profiling is on
+
+        if self.profiler is None:
+            return func(*args)
+        return self.profiler.timed(stage, func, *args)
+
+    def _count(self, name, n = 1):
+        if self.profiler is not None:
+            self.profiler.count(name, n)
+
+    def _count_fast_path(self, n = 1):
+        self.fast_path_rows += n
+        self._count("fast_path", n)
 
     def analyze_sentiment(self, text):
-        # Analyze sentiment of any given text
+        # Analyze sentiment of any given text, reusing cached results for repeated texts
         # Arguments: text (str): Text to analyze
         # Then returns: dict: dictionary containing analysis results
+
+        if self.cache is None or not isinstance(text, str):
+            return self._score_text(text)
+
+        cached = self.cache.get(text)
+        if cached is not None:
+            self._count("cache_hits")
+            # Copies are handed out so callers can't modify the cached entry
+            return dict(cached)
+        self._count("cache_misses")
+
+        result = self._score_text(text)
+        self._cache_result(text, result)
+        return result
+
+    def _cache_result(self, text, result):
+        # Stores a copy of a successful result for a string input
+
+        if self.cache is not None and isinstance(text, str) and result['confidence'] != 'error':
+            self.cache.put(text, dict(result))
+
+    def _score_text(self, text):
+        # Cleans and scores a single text without looking at the cache
+
         if not text or not isinstance(text, str):
-            return {
-                'text': text,
-                'cleaned_text': '',
-                'polarity': 0.0,
-                'subjectivity': 0.0,
-                'sentiment': 'neutral',
-                'confidence': 'low'
-            }
+            return _neutral_result(text, 'low')
         
         try:
+            backend = self.backend
+
             # This calls clean_text in order to standardize text
             # Eg: clean_text("I LOVE this product! It's AMAZING!") returns: "love product amazing"
             # Making it easier to analyze
-            cleaned = clean_text(text)
-            blob = TextBlob(cleaned if cleaned else text)
-            # Blob is so to make sure it's not an empty string of text to analyze
-            # And "else text" is to use the original text in case of empty cleaned oh and also non-english text
+            cleaned = clean_text(text, self.profiler)
 
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
+            # Texts without a single word or emoticon the lexicon knows (emoji, numbers, other
+            # languages) can only score 0, so they skip the backend
+            if not self._timed("screening", backend.screen.is_scorable, cleaned, text):
+                self._count_fast_path()
+                return self._timed("classification", _build_result, text, cleaned, 0.0, 0.0)
 
-            # Determines sentimnents depending on confidence level
+            polarity, subjectivity = self._timed("scoring", backend.score, cleaned if cleaned else text)
+            # Scoring the cleaned text makes sure it's not an empty string of text to analyze
+            # And "else text" is to use the original text in case of empty cleaned oh and also non-english text
 
-            if polarity > 0.1:
-                sentiment = 'positive'
-                confidence = 'high' if polarity > 0.5 else 'medium'
-            elif polarity < -0.1:
-                sentiment = 'negative'
-                confidence = 'high' if polarity < -0.5 else 'medium'
-            else:
-                sentiment = 'neutral'
-                confidence = 'low'
-            
-            return {
-                'text': text,
-                'cleaned_text': cleaned,
-                'polarity': round(polarity, 4),
-                'subjectivity': round(subjectivity, 4),
-                'sentiment': sentiment,
-                'confidence': confidence
-            }
+            return self._timed("classification", _build_result, text, cleaned, polarity, subjectivity)
             
         except Exception as e:
             print(f"Error analyzing sentiment: {e}")
-            return {
-                'text': text,
-                'cleaned_text': '',
-                'polarity': 0.0,
-                'subjectivity': 0.0,
-                'sentiment': 'neutral',
-                'confidence': 'error'
-            }
-
-    def analyze_batch(self, texts):
-        # Analyzes sentiment for a list of texts
+            self._count("errors")
+            return _neutral_result(text, 'error')
+
+    def _score_block(self, texts, rows, results):
+        # Cleans and scores the texts at the given rows with one backend call, writing into results
+
+        block = [texts[i] for i in rows]
+        try:
+            backend = self.backend
+            cleaned = clean_batch(block, self.profiler)
+            polarities, subjectivities = self._score_screened(backend, block, cleaned)
+        except Exception:
+            # Score one by one so a single bad text only fails its own row
+            self._count("block_fallbacks")
+            for i, text in zip(rows, block):
+                result = self._score_text(text)
+                results.set_record(i, result)
+                self._cache_result(text, result)
+            return
+
+        self._timed("classification", results.set_scores, rows, block, cleaned, polarities, subjectivities)
+        if self.cache is not None:
+            for text, c, p, s in zip(block, cleaned, polarities, subjectivities):
+                self.cache.put(text, _build_result(text, c, p, s))
+
+    def _score_screened(self, backend, block, cleaned):
+        # Scores a block with the backend, except for the texts the vocabulary screen rules out,
+        # which get 0.0 without being scored
+        # Then returns: tuple: (polarities, subjectivities) for every text of the block
+
+        is_scorable = backend.screen.is_scorable
+        scorable = self._timed("screening", lambda: [j for j, (c, text) in enumerate(zip(cleaned, block))
+                                                     if is_scorable(c, text)])
+        self._count_fast_path(len(block) - len(scorable))
+
+        inputs = [cleaned[j] if cleaned[j] else block[j] for j in scorable]
+        if len(scorable) == len(block):
+            return self._timed("scoring", backend.score_batch, inputs)
+
+        polarities = [0.0] * len(block)
+        subjectivities = [0.0] * len(block)
+        if scorable:
+            scored_polarities, scored_subjectivities = self._timed("scoring", backend.score_batch, inputs)
+            for j, p, s in zip(scorable, scored_polarities, scored_subjectivities):
+                polarities[j] = p
+                subjectivities[j] = s
+        return polarities, subjectivities
+
+    def analyze_batch(self, texts, workers = 1, chunk_size = 500, keep_text = True):
+        # Analyzes sentiment for a list of texts, scoring each distinct text only once
         # Arguments: texts(list): List of texts to analyze
-        # Returning: list: List of analysis results
+        #            workers(int): Number of worker processes, None uses every core
+        #            chunk_size(int): Number of texts sent to a worker at a time
+        #            keep_text(bool): Keep the text and cleaned_text columns
+        # Returning: BatchResult: Columnar results in the same order as texts,
+        #            which indexes and iterates like the list of result dicts
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if workers is None:
+            workers = os.cpu_count() or 1
 
-        results = []
+        unique_texts, positions = _dedupe(texts)
+        self._count("texts", len(positions))
+        self._count("duplicates", len(positions) - len(unique_texts))
+
+        if workers > 1 and len(unique_texts) > chunk_size:
+            unique_results = self._analyze_parallel(unique_texts, workers, chunk_size, keep_text)
+        else:
+            unique_results = self._analyze_serial(unique_texts, keep_text)
+
+        # Fan the distinct results back out to every input row
+        if len(unique_texts) == len(positions):
+            return unique_results
+        return unique_results.take(positions)
+
+    def _lookup_cached(self, texts, results):
+        # Fills in the rows that need no scoring (empty input and cache hits)
+        # Returns the indices of the texts still to score
+
+        pending = []
+        hits = 0
         for i, text in enumerate(texts):
-            if i % 100 == 0 and i > 0:
-                print(f"Processed {i} texts...")
-            results.append(self.analyze_sentiment(text))
-        return results
\ No newline at end of file
+            if not text or not isinstance(text, str):
+                results.set_record(i, _neutral_result(text, 'low'))
+                continue
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is not None:
+                results.set_record(i, cached)
+                hits += 1
+            else:
+                pending.append(i)
+
+        if self.cache is not None:
+            self._count("cache_hits", hits)
+            self._count("cache_misses", len(pending))
+        return pending
+
+    def _analyze_serial(self, texts, keep_text = True):
+        # Scores texts in this process, a block at a time
+
+        from results import BatchResult
+
+        results = BatchResult.allocate(len(texts), keep_text)
+        pending = self._lookup_cached(texts, results)
+
+        done = len(texts) - len(pending)
+        for start in range(0, len(pending), SCORING_BLOCK_SIZE):
+            block = pending[start:start + SCORING_BLOCK_SIZE]
+            self._score_block(texts, block, results)
+
+            done += len(block)
+            if self.progress is not None:
+                self.progress(done, len(texts))
+        return results
+
+    def _analyze_parallel(self, texts, workers, chunk_size, keep_text = True):
+        # Splits texts into chunks and scores them across a process pool
+        # Cached texts are answered here, only the misses are sent to the workers
+
+        from concurrent.futures import ProcessPoolExecutor
+        from itertools import repeat
+        from results import BatchResult
+
+        results = BatchResult.allocate(len(texts), keep_text)
+        pending = self._lookup_cached(texts, results)
+        if not pending:
+            return results
+
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        workers = min(workers, len(chunks))
+        # The cache stores whole result dicts, so workers send the text columns back when it's on
+        worker_keep_text = keep_text or self.cache is not None
+
+        done = len(texts) - len(pending)
+
+        if self._pool is not None:
+            pool = nullcontext(self._pool)
+        else:
+            pool = ProcessPoolExecutor(max_workers = workers, initializer = init_worker,
+                                       initargs = (self.backend_name, 0, self.profiler is not None))
+
+        with pool as executor:
+            # map() hands back chunk results in submission order, so output lines up with input
+            chunk_texts = ([texts[i] for i in chunk] for chunk in chunks)
+            parts = executor.map(analyze_chunk_counted, chunk_texts, repeat(worker_keep_text))
+            for chunk, (part, fast_path_rows, summary) in zip(chunks, parts):
+                # The worker's profile already counts its fast path rows
+                self.fast_path_rows += fast_path_rows
+                if summary is not None:
+                    self.profiler.merge(summary)
+                results.set_rows(chunk, part)
+                if self.cache is not None:
+                    for i, result in zip(chunk, part):
+                        self._cache_result(texts[i], result)
+                done += len(chunk)
+                if self.progress is not None:
+                    self.progress(done, len(texts))
+        return results
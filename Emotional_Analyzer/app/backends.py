@@ -0,0 +1,182 @@
+import re
+
+# textblob and numpy are imported when a backend is created, not when this module is imported
+
+# Texts made only of lowercase word tokens of 3+ characters separated by single spaces
+# This is what clean_text produces, and the only input the vectorized scorer handles itself
+# "_" is left out: TextBlob's tokenizer strips it off tokens ("_awful_" scores as "awful")
+_SIMPLE_TEXT_RE = re.compile(r'[^\W_]{3,}(?: [^\W_]{3,})*')
+_WORD_RE = re.compile(r'\w+')
+
+class ScoringScreen:
+    # Index of every token TextBlob's pattern analyzer can score: lexicon words, non-alphabetic
+    # emoticons and the "(!)" irony mark. A text that can't contain any of them scores exactly
+    # (0.0, 0.0), so it can skip the analyzer altogether.
+
+    def __init__(self):
+        from textblob._text import EMOTICONS
+        from textblob.en import sentiment as pattern_sentiment
+
+        tokens = set(pattern_sentiment.keys())
+        tokens.update(e.lower() for emoticons in EMOTICONS.values() for e in emoticons if not e.lower().isalpha())
+        tokens.add("(!)")
+        self.tokens = frozenset(tokens)
+
+        # Characters that can make the analyzer's tokenizer produce a scorable token that
+        # splitting on spaces or taking runs of word characters would miss
+        # ("_" is a word character, but the tokenizer strips it off tokens)
+        self.special_chars = frozenset({c for token in tokens for c in token if not c.isalnum() and c != " "} | {"_"})
+
+    def is_scorable(self, cleaned, text):
+        # Whether the analyzer could give text a non-zero score
+        # Arguments: cleaned (str): clean_text(text), which is what gets scored unless it's empty
+        #            text (str): Original text, scored when cleaned is empty
+        # Returning False is only done when the score is certain to be (0.0, 0.0)
+
+        if cleaned:
+            return not (self.special_chars.isdisjoint(cleaned) and self.tokens.isdisjoint(cleaned.split()))
+
+        text = text.lower()
+        return not (self.special_chars.isdisjoint(text) and self.tokens.isdisjoint(_WORD_RE.findall(text)))
+
+class TextBlobBackend:
+    # Scores texts with TextBlob's pattern analyzer, one text at a time
+
+    name = "textblob"
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._blob = TextBlob
+        self.screen = ScoringScreen()
+
+    def score(self, text):
+        # Returns (polarity, subjectivity) for a single text
+
+        sentiment = self._blob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+    def score_batch(self, texts):
+        # Returns lists of polarities and subjectivities, in the same order as texts
+
+        scores = [self.score(text) for text in texts]
+        return [p for p, _ in scores], [s for _, s in scores]
+
+class LexiconBackend:
+    # Vectorized version of TextBlob's pattern analyzer
+    # The lexicon TextBlob uses is loaded once into arrays and whole batches are scored with NumPy
+
+    name = "lexicon"
+
+    def __init__(self):
+        import numpy as np
+        from textblob._text import EMOTICONS
+        from textblob.en import sentiment as pattern_sentiment
+
+        self._pattern_sentiment = pattern_sentiment
+        words = list(pattern_sentiment.keys())
+        self.vocabulary = {word: i for i, word in enumerate(words)}
+
+        # TextBlob scores plain strings with the sense averaged over every part of speech
+        senses = np.array([pattern_sentiment[word][None] for word in words], dtype = np.float64)
+        self.polarity = senses[:, 0]
+        self.subjectivity = senses[:, 1]
+        self.intensity = senses[:, 2]
+        # Adverbs modify the word that directly follows them ("really good")
+        self.is_modifier = np.array([any(pos in pattern_sentiment[word] for pos in pattern_sentiment.modifiers)
+                                     for word in words], dtype = bool)
+
+        # Tokens that switch on rules the vectorized path doesn't model
+        self._special_tokens = set(pattern_sentiment.negations)
+        self._special_tokens.update(e.lower() for emoticons in EMOTICONS.values() for e in emoticons
+                                    if not e.lower().isalpha())
+        self.screen = ScoringScreen()
+
+    def score(self, text):
+        # Returns (polarity, subjectivity) for a single text
+
+        polarities, subjectivities = self.score_batch([text])
+        return float(polarities[0]), float(subjectivities[0])
+
+    def score_batch(self, texts):
+        # Returns float arrays of polarities and subjectivities, in the same order as texts
+
+        import numpy as np
+
+        pattern_sentiment = self._pattern_sentiment
+        polarities = np.zeros(len(texts), dtype = np.float64)
+        subjectivities = np.zeros(len(texts), dtype = np.float64)
+
+        vocabulary = self.vocabulary
+        rows = []
+        token_ids = []
+        for row, text in enumerate(texts):
+            lowered = text.lower()
+            tokens = lowered.split(" ")
+            if not _SIMPLE_TEXT_RE.fullmatch(lowered) or not self._special_tokens.isdisjoint(tokens):
+                # Punctuation, underscores, negations, short words and emoticons go through TextBlob's own rules
+                polarities[row], subjectivities[row] = pattern_sentiment(text)
+                continue
+
+            token_ids.extend(vocabulary.get(token, -1) for token in tokens)
+            rows.extend([row] * len(tokens))
+
+        if token_ids:
+            self._score_tokens(np.array(rows, dtype = np.intp), np.array(token_ids, dtype = np.intp),
+                               polarities, subjectivities)
+        return polarities, subjectivities
+
+    def _score_tokens(self, rows, ids, polarities, subjectivities):
+        # Scores the flattened tokens of every simple text at once
+        # With no negations or short words, the pattern rules reduce to: a known adverb followed
+        # directly by a known word merges with it into one assessment scaled by the adverb's intensity
+
+        import numpy as np
+
+        known = ids >= 0
+        safe_ids = np.where(known, ids, 0)
+        modifier = known & self.is_modifier[safe_ids]
+
+        # joins[j]: token j extends the assessment started by the token before it
+        joins = np.zeros(len(ids), dtype = bool)
+        joins[1:] = known[1:] & modifier[:-1] & (rows[1:] == rows[:-1])
+
+        # An assessment ends at a known token that the next token doesn't join
+        ends = known.copy()
+        ends[:-1] &= ~joins[1:]
+        ends = np.flatnonzero(ends)
+
+        p = self.polarity[safe_ids[ends]]
+        s = self.subjectivity[safe_ids[ends]]
+        merged = joins[ends]
+        scale = self.intensity[safe_ids[ends[merged] - 1]]
+        p[merged] = np.clip(p[merged] * scale, -1.0, 1.0)
+        s[merged] = np.clip(s[merged] * scale, -1.0, 1.0)
+
+        # Each text scores the plain average of its assessments, or 0.0 without any
+        size = len(polarities)
+        counts = np.bincount(rows[ends], minlength = size)
+        has_scores = counts > 0
+        polarity_sums = np.bincount(rows[ends], weights = p, minlength = size)
+        subjectivity_sums = np.bincount(rows[ends], weights = s, minlength = size)
+
+        polarities[has_scores] = polarity_sums[has_scores] / counts[has_scores]
+        subjectivities[has_scores] = subjectivity_sums[has_scores] / counts[has_scores]
+
+# Scoring backends selectable through SentimentAnalyzer(backend = ...)
+BACKENDS = {
+    TextBlobBackend.name: TextBlobBackend,
+    LexiconBackend.name: LexiconBackend
+}
+
+def backend_class(name):
+    # Returns the backend class registered under name, without loading anything
+
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown sentiment backend '{name}', choose from: {', '.join(BACKENDS)}")
+
+def get_backend(name):
+    # Creates the scoring backend registered under name
+
+    return backend_class(name)()
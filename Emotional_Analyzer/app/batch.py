@@ -0,0 +1,178 @@
+# Non-interactive batch mode: analyzes many files at once across a process pool
+# Usage: python batch.py <directory or glob> [--workers N] [--output-dir DIR] [--format parquet]
+#                        [--summary summary.json]
+#
+# Every file (CSV, Parquet or Arrow) is streamed by one worker, which keeps a warm analyzer for all
+# the files it gets, and is written to <name>_sentiment_results.<format>. The per-file totals are
+# merged into one summary.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from analyzer import SentimentAnalyzer
+from formats import EXTENSIONS, FORMATS, read_columns, results_path
+from main import STREAM_CHUNK_ROWS, guess_text_column, print_summary
+
+# Analyzer owned by a batch worker process, created once by init_file_worker
+_file_analyzer = None
+
+def init_file_worker(backend, cache_size = 0):
+    # Pool initializer: loads the NLTK data and the backend once per worker, not once per file
+
+    global _file_analyzer
+    _file_analyzer = SentimentAnalyzer(cache_size = cache_size, backend = backend).warm_up()
+
+def find_input_files(pattern):
+    # Returns the CSV, Parquet and Arrow files in a directory, or the files matching a glob, sorted by name
+    # Results files from earlier runs are skipped
+
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if os.path.splitext(name)[1].lower() in FORMATS]
+    else:
+        paths = glob.glob(pattern)
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and not os.path.splitext(path)[0].endswith("_sentiment_results"))
+
+def analyze_file(file_path, output_path, column = None, chunk_size = STREAM_CHUNK_ROWS):
+    # Streams one file through the worker's analyzer
+    # Arguments: file_path (str): CSV, Parquet or Arrow file to read
+    #            output_path (str): File the results are written to, in the format of its extension
+    #            column (str): Text column, guessed from the header when None
+    #            chunk_size (int): Number of rows read at a time
+    # Then returns: dict: file, output, column, seconds, fast_path_rows and stats (SummaryStats), or file and error
+
+    from streaming import analyze_file_stream
+
+    start = time.perf_counter()
+    try:
+        col_name = column or guess_text_column(read_columns(file_path))
+        if col_name is None:
+            raise ValueError("no text column found, pass --column")
+
+        fast_path_rows = _file_analyzer.fast_path_rows
+        stats = analyze_file_stream(_file_analyzer, file_path, col_name, output_path,
+                                    chunk_size = chunk_size, workers = 1)
+        return {
+            "file": file_path,
+            "output": output_path,
+            "column": col_name,
+            "seconds": time.perf_counter() - start,
+            "fast_path_rows": _file_analyzer.fast_path_rows - fast_path_rows,
+            "stats": stats
+        }
+    except Exception as e:
+        return {"file": file_path, "error": str(e)}
+
+def analyze_files(file_paths, workers = None, backend = "lexicon", cache_size = 10000,
+                  output_dir = None, column = None, chunk_size = STREAM_CHUNK_ROWS, output_format = None):
+    # Analyzes every file, several at a time
+    # Arguments: file_paths (list): CSV, Parquet or Arrow files to analyze
+    #            workers (int): Worker processes, None uses every core and 1 runs here
+    #            backend (str): Scoring backend of the workers' analyzers
+    #            cache_size (int): Results cached by each worker across its files
+    #            output_format (str): "csv", "parquet" or "arrow", by default each input's own format
+    # Then returns: tuple: (SummaryStats over every file, list of analyze_file reports in file order)
+
+    from streaming import SummaryStats
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok = True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(file_paths)))
+
+    jobs = [(path, results_path(path, output_format, output_dir), column, chunk_size) for path in file_paths]
+    reports = {}
+
+    if workers == 1:
+        init_file_worker(backend, cache_size)
+        for job in jobs:
+            reports[job[0]] = analyze_file(*job)
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        # Biggest files go first so one large file does not start last and hold up the run
+        jobs.sort(key = lambda job: os.path.getsize(job[0]), reverse = True)
+        with ProcessPoolExecutor(max_workers = workers, initializer = init_file_worker,
+                                 initargs = (backend, cache_size)) as executor:
+            futures = [executor.submit(analyze_file, *job) for job in jobs]
+            for future in as_completed(futures):
+                report = future.result()
+                reports[report["file"]] = report
+                print(f" Finished {report['file']}" + (f" (error: {report['error']})" if "error" in report else ""))
+
+    combined = SummaryStats()
+    ordered = [reports[path] for path in file_paths]
+    for report in ordered:
+        if "stats" in report:
+            combined.merge(report["stats"])
+    return combined, ordered
+
+def write_summary(path, combined, reports, seconds):
+    # Writes the combined and per-file totals as JSON
+
+    summary = {
+        "files": len(reports),
+        "failed": sum(1 for report in reports if "error" in report),
+        "seconds": seconds,
+        "rows_per_s": combined.total / seconds if seconds > 0 else None,
+        "fast_path_rows": sum(report.get("fast_path_rows", 0) for report in reports),
+        "combined": combined.to_dict(),
+        "per_file": [
+            {key: value for key, value in report.items() if key != "stats"}
+            | ({"summary": report["stats"].to_dict()} if "stats" in report else {})
+            for report in reports
+        ]
+    }
+    with open(path, "w") as f:
+        json.dump(summary, f, indent = 2)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Analyze every CSV, Parquet or Arrow file in a directory or matching a glob")
+    parser.add_argument("inputs", help = "directory of CSV, Parquet or Arrow files, or a glob such as 'shards/*.csv'")
+    parser.add_argument("--workers", type = int, default = None, help = "files analyzed at once (default: one per core)")
+    parser.add_argument("--backend", default = "lexicon", choices = ["lexicon", "textblob"])
+    parser.add_argument("--cache-size", type = int, default = 10000, help = "results cached per worker")
+    parser.add_argument("--column", default = None, help = "text column (default: guessed from each header)")
+    parser.add_argument("--output-dir", default = None, help = "where results go (default: next to each input)")
+    parser.add_argument("--format", default = None, choices = sorted(EXTENSIONS),
+                        help = "results format (default: the format of each input)")
+    parser.add_argument("--summary", default = None, help = "write the combined summary to this JSON file")
+    parser.add_argument("--charts", action = "store_true", help = "draw the charts for the combined results")
+    args = parser.parse_args()
+
+    file_paths = find_input_files(args.inputs)
+    if not file_paths:
+        print(f" No CSV, Parquet or Arrow files found for: {args.inputs}")
+        return 1
+    print(f" Analyzing {len(file_paths)} files.")
+
+    start = time.perf_counter()
+    combined, reports = analyze_files(file_paths, workers = args.workers, backend = args.backend,
+                                      cache_size = args.cache_size, output_dir = args.output_dir,
+                                      column = args.column, output_format = args.format)
+    seconds = time.perf_counter() - start
+
+    failed = [report for report in reports if "error" in report]
+    for report in failed:
+        print(f" Failed {report['file']}: {report['error']}")
+    print(f" Analyzed {combined.total} rows from {len(reports) - len(failed)} files in {seconds:.1f}s")
+
+    if combined.total:
+        print_summary(combined.counts_series(), combined.total, combined.mean_polarity, combined.mean_subjectivity)
+        if args.charts:
+            from main import draw_charts
+            draw_charts(combined.counts_series(), combined.words.to_dict(), combined.polarity_histogram)
+
+    if args.summary:
+        write_summary(args.summary, combined, reports, seconds)
+        print(f" Summary saved to {args.summary}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
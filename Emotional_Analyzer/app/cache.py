@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+class ResultCache:
+    # Bounded LRU cache of analysis results, keyed on the raw text
+    # The least recently used entry is evicted once max_size is reached
+
+    def __init__(self, max_size = 10000):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        # Returns the cached result for text, or None on a miss
+
+        result = self._entries.get(text)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(text)
+        self.hits += 1
+        return result
+
+    def put(self, text, result):
+        # Stores a result, evicting the least recently used entry when full
+
+        self._entries[text] = result
+        self._entries.move_to_end(text)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        # Returns the hit/miss counters and current size as a dict
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,123 @@
+import os
+
+# pyarrow is only imported when a Parquet or Arrow file is read or written
+
+# File extension -> format name
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow"
+}
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+def file_format(path):
+    # Returns "csv", "parquet" or "arrow" from the file extension
+    # Anything else is read as CSV, as the CLI always did
+
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+def results_path(file_path, fmt = None, output_dir = None):
+    # reviews.parquet -> reviews_sentiment_results.parquet, next to the input or in output_dir
+    # fmt picks the results format, by default the input's
+
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    name = stem + "_sentiment_results" + EXTENSIONS[fmt or file_format(file_path)]
+    return os.path.join(output_dir or os.path.dirname(file_path), name)
+
+def _open_arrow(path):
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path, "r"))
+
+def read_columns(path):
+    # Returns the column names without reading any rows
+
+    fmt = file_format(path)
+    if fmt == "csv":
+        import pandas as pd
+        return list(pd.read_csv(path, nrows = 0).columns)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return _open_arrow(path).schema.names
+
+def iter_texts(path, col_name, chunk_size = 10000):
+    # Yields the non-empty values of one column as lists of strings, chunk_size rows at a time
+    # Only that column is read, and only one chunk is held at once
+
+    fmt = file_format(path)
+    if fmt == "csv":
+        import pandas as pd
+        for chunk in pd.read_csv(path, usecols = [col_name], chunksize = chunk_size):
+            yield chunk[col_name].dropna().astype(str).tolist()
+        return
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size = chunk_size, columns = [col_name])
+    else:
+        reader = _open_arrow(path)
+        index = reader.schema.get_field_index(col_name)
+        if index < 0:
+            raise KeyError(col_name)
+        # Arrow files are memory-mapped, so slicing a record batch reads nothing else
+        batches = (batch.column(index).slice(start, chunk_size)
+                   for batch in (reader.get_batch(i) for i in range(reader.num_record_batches))
+                   for start in range(0, batch.num_rows, chunk_size))
+
+    for batch in batches:
+        column = batch.column(0) if isinstance(batch, pa.RecordBatch) else batch
+        column = pc.drop_null(column)
+        if not pa.types.is_string(column.type) and not pa.types.is_large_string(column.type):
+            column = pc.cast(column, pa.string())
+        yield column.to_pylist()
+
+class ResultWriter:
+    # Appends BatchResult chunks to a results file
+    # CSV is written as text; Parquet and Arrow keep the types (float scores, dictionary-encoded labels)
+
+    def __init__(self, path, fmt = None):
+        self.path = path
+        self.format = fmt or file_format(path)
+        self.rows = 0
+        self._writer = None
+
+    def write(self, results):
+        if self.format == "csv":
+            first = self.rows == 0
+            results.to_dataframe().to_csv(self.path, mode = "w" if first else "a", header = first, index = False)
+        else:
+            table = results.to_arrow()
+            if self._writer is None:
+                self._writer = self._open(table.schema)
+            self._writer.write_table(table)
+        self.rows += len(results)
+
+    def _open(self, schema):
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.path, schema)
+
+        import pyarrow as pa
+        return pa.ipc.new_file(self.path, schema)
+
+    def close(self):
+        if self.format != "csv" and self._writer is None:
+            # No rows: still write the schema so readers can open the file
+            from results import BatchResult
+            self._writer = self._open(BatchResult.allocate(0).to_arrow().schema)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
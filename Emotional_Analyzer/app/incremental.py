@@ -0,0 +1,200 @@
+import hashlib
+import os
+import sqlite3
+import pandas as pd
+from streaming import SummaryStats
+
+RESULT_COLUMNS = ['text', 'cleaned_text', 'polarity', 'subjectivity', 'sentiment', 'confidence']
+
+def store_path_for(output_path):
+    # The store lives next to the results file: reviews_sentiment_results.csv -> .sqlite
+
+    return os.path.splitext(output_path)[0] + ".sqlite"
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size = 16).digest()
+
+class ResultStore:
+    # Persistent record of every scored row of a CSV file, keyed by its row offset
+    # A row is re-scored only when it is new or its text hash changed
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                row_index INTEGER PRIMARY KEY,
+                text_hash BLOB NOT NULL,
+                text TEXT,
+                cleaned_text TEXT,
+                polarity REAL,
+                subjectivity REAL,
+                sentiment TEXT,
+                confidence TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def get_meta(self, key, default = None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def max_row_index(self):
+        return self.conn.execute("SELECT MAX(row_index) FROM results").fetchone()[0]
+
+    def hashes_between(self, first, last):
+        # Returns {row_index: text_hash} for the stored rows in [first, last]
+
+        return dict(self.conn.execute(
+            "SELECT row_index, text_hash FROM results WHERE row_index BETWEEN ? AND ?", (first, last)))
+
+    def delete_rows(self, row_indices):
+        self.conn.executemany("DELETE FROM results WHERE row_index = ?", [(i,) for i in row_indices])
+
+    def delete_after(self, last):
+        # Drops rows past the end of the file, returning how many there were
+
+        return self.conn.execute("DELETE FROM results WHERE row_index > ?", (last,)).rowcount
+
+    def upsert(self, row_indices, hashes, results):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(i, h, r['text'], r['cleaned_text'], r['polarity'], r['subjectivity'], r['sentiment'], r['confidence'])
+             for i, h, r in zip(row_indices, hashes, results)])
+
+    def iter_frames(self, after = None, chunk_size = 10000):
+        # Yields the stored results in row order as DataFrames of at most chunk_size rows
+
+        query = f"SELECT {', '.join(RESULT_COLUMNS)} FROM results"
+        params = ()
+        if after is not None:
+            query += " WHERE row_index > ?"
+            params = (after,)
+        query += " ORDER BY row_index"
+        return pd.read_sql_query(query, self.conn, params = params, chunksize = chunk_size)
+
+    def summary(self):
+        # Summary statistics over every stored row, computed by SQLite (word counts excepted)
+
+        stats = SummaryStats()
+        total, polarity_sum, subjectivity_sum = self.conn.execute(
+            "SELECT COUNT(*), SUM(polarity), SUM(subjectivity) FROM results").fetchone()
+        stats.total = total
+        stats.polarity_sum = polarity_sum or 0.0
+        stats.subjectivity_sum = subjectivity_sum or 0.0
+        stats.sentiment_counts = dict(self.conn.execute(
+            "SELECT sentiment, COUNT(*) FROM results GROUP BY sentiment"))
+
+        # Polarity is stored rounded to 4 decimals, so counting each distinct score
+        # returns at most 20001 rows however many are stored
+        distinct = self.conn.execute("SELECT polarity, COUNT(*) FROM results GROUP BY polarity").fetchall()
+        if distinct:
+            polarities, counts = zip(*distinct)
+            stats.polarity_histogram.update(polarities, weights = counts)
+
+        # Word counts for the word cloud, streamed from the stored cleaned texts
+        stats.words.update(row[0] for row in self.conn.execute("SELECT cleaned_text FROM results"))
+        return stats
+
+def _csv_signature(path):
+    # Size and mtime of the results file, used to notice it was changed outside this module
+
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _write_results(store, output_path, after = None, chunk_size = 10000):
+    # Writes stored rows to the results file, appending only the rows past `after` when given
+
+    first_chunk = after is None
+    for frame in store.iter_frames(after, chunk_size):
+        frame.to_csv(output_path, mode = "w" if first_chunk else "a", header = first_chunk, index = False)
+        first_chunk = False
+    if first_chunk:
+        # Nothing stored at all: still leave a results file with its header
+        pd.DataFrame(columns = RESULT_COLUMNS).to_csv(output_path, index = False)
+
+def analyze_csv_incremental(analyzer, file_path, col_name, output_path, chunk_size = 10000, workers = None):
+    # Re-analyzes a CSV file, scoring only the rows that are new or changed since the last run
+    # Results are kept in a SQLite store next to output_path and merged into the results file
+    # Arguments: analyzer (SentimentAnalyzer): Analyzer used to score the texts
+    #            file_path (str): CSV file to read
+    #            col_name (str): Column holding the text
+    #            output_path (str): CSV file the results are written to
+    #            chunk_size (int): Number of rows read at a time
+    #            workers (int): Worker processes passed on to analyze_batch
+    # Then returns: tuple: (SummaryStats over every row, number of rows scored in this run)
+
+    store = ResultStore(store_path_for(output_path))
+    try:
+        previous_max = store.max_row_index()
+        # The results file can only be appended to if the last run finished writing it
+        # and nobody touched it since
+        in_sync = (store.get_meta("csv_synced") == "1"
+                   and store.get_meta("csv_signature") == _csv_signature(output_path))
+        store.set_meta("csv_synced", 0)
+        store.conn.commit()
+
+        rewritten = False
+        scored = 0
+        last_index = -1
+        # One worker pool serves every chunk
+        with analyzer.worker_pool(workers):
+            for chunk in pd.read_csv(file_path, usecols = [col_name], chunksize = chunk_size):
+                if chunk.empty:
+                    continue
+                last_index = int(chunk.index[-1])
+                stored = store.hashes_between(int(chunk.index[0]), last_index)
+
+                valid = chunk[col_name].dropna().astype(str)
+                row_indices = []
+                texts = []
+                hashes = []
+                for row_index, text in zip(valid.index.tolist(), valid.tolist()):
+                    digest = text_hash(text)
+                    if stored.get(row_index) != digest:
+                        # Anything at or before the last stored row (edited, or empty before and filled
+                        # now) lands inside what the results file already holds, so it can't be appended
+                        if previous_max is not None and row_index <= previous_max:
+                            rewritten = True
+                        row_indices.append(row_index)
+                        texts.append(text)
+                        hashes.append(digest)
+
+                # Rows that became empty are dropped from the results
+                emptied = set(stored) - set(valid.index.tolist())
+                if emptied:
+                    store.delete_rows(emptied)
+                    rewritten = True
+
+                if texts:
+                    store.upsert(row_indices, hashes, analyzer.analyze_batch(texts, workers = workers))
+                    scored += len(texts)
+                store.conn.commit()
+
+        # Rows past the end of a file that got shorter
+        if store.delete_after(last_index):
+            rewritten = True
+
+        if in_sync and not rewritten:
+            _write_results(store, output_path, after = previous_max if previous_max is not None else -1,
+                           chunk_size = chunk_size)
+        else:
+            _write_results(store, output_path, chunk_size = chunk_size)
+
+        store.set_meta("csv_signature", _csv_signature(output_path))
+        store.set_meta("csv_synced", 1)
+        store.conn.commit()
+        return store.summary(), scored
+    finally:
+        store.close()
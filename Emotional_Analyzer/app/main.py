@@ -1,8 +1,9 @@
 from analyzer import SentimentAnalyzer
-from visualization import plot_polarity_distribution, generate_wordcloud, plot_sentiment_distribution
-import pandas as pd
 import os
 
+# pandas, matplotlib and wordcloud are imported inside the CSV code path, so the menu
+# shows up without paying for them
+
 def print_header():
     # Prints the CLI header
 
@@ -23,11 +24,11 @@ def analyze_single_text(analyzer):
     print("\n" + "=" * 40)
     print("Analysis Results")
     print("=" * 40)
-    print(f"Original text: {result["text"]}")
-    print(f"Cleaned text: {result["cleaned_text"]}")
-    print(f"Sentiment: {result["sentiment"].upper()} ({result["confidence"]} confidence)")
-    print(f"Polarity: {result["polarity"]:.4f} (Range: -1 to 1)")
-    print(f"Subjectivity: {result["subjectivity"]:.4f} (0 = objective, 1 = subjective)")
+    print(f"Original text: {result['text']}")
+    print(f"Cleaned text: {result['cleaned_text']}")
+    print(f"Sentiment: {result['sentiment'].upper()} ({result['confidence']} confidence)")
+    print(f"Polarity: {result['polarity']:.4f} (Range: -1 to 1)")
+    print(f"Subjectivity: {result['subjectivity']:.4f} (0 = objective, 1 = subjective)")
 
     # Interpretation
 
@@ -38,16 +39,109 @@ def analyze_single_text(analyzer):
     else:
         print(" This text is neutral.")
 
+def print_progress(done, total):
+    # Progress callback for batch analysis
+
+    print(f"Processed {done}/{total} texts...")
+
+def report_fast_path(fast_path_rows):
+    # Tells how many texts had nothing to score (no known words or emoticons) and skipped the scorer
+
+    if fast_path_rows:
+        print(f" {fast_path_rows} texts had no words to score and were marked neutral without scoring.")
+
+def report_profile(analyzer, profile_path):
+    # Prints the profile of the last CSV analysis, writes it to profile_path and starts a new one
+
+    if analyzer.profiler is None:
+        return
+    print("\nProfile")
+    print(analyzer.profiler.format())
+    try:
+        analyzer.profiler.dump(profile_path)
+        print(f" Profile saved to {profile_path}")
+    except Exception as e:
+        print(f"Error saving profile: {e}")
+    analyzer.profiler.reset()
+
+def draw_charts(sentiment_counts, word_frequencies = None, polarity_histogram = None):
+    # Renders the charts from aggregates, in parallel worker processes
+    # SENTIMENT_CHART_DPI and SENTIMENT_CHART_FORMAT (png, svg, pdf, ...) set the output resolution and format
+
+    from visualization import CHART_DPI, CHART_FORMAT, render_charts
+
+    print("\nGenerating visualizations.")
+    try:
+        dpi = int(os.environ.get("SENTIMENT_CHART_DPI", CHART_DPI))
+    except ValueError:
+        print(f" Invalid SENTIMENT_CHART_DPI, using {CHART_DPI}")
+        dpi = CHART_DPI
+    image_format = os.environ.get("SENTIMENT_CHART_FORMAT", CHART_FORMAT).lower()
+
+    render_charts(sentiment_counts, word_frequencies, polarity_histogram, dpi = dpi, image_format = image_format)
+    print("All visualizations saved to 'outputs' folder")
+
+# Files at least this big are streamed in chunks instead of loaded whole
+STREAM_THRESHOLD_BYTES = 100 * 1024 * 1024
+STREAM_CHUNK_ROWS = 10000
+
+def guess_text_column(columns):
+    # Returns the first column whose name looks like it holds text, or None
+
+    text_columns = [col for col in columns if "text" in col.lower() or "comment" in col.lower() or "review" in col.lower()]
+    return text_columns[0] if text_columns else None
+
+def choose_text_column(columns):
+    # Picks the column containing text, asking the user when none looks like one
+
+    col_name = guess_text_column(columns)
+    if col_name is not None:
+        print(f"Using column: '{col_name}'")
+        return col_name
+
+    print("Available columns: ", list(columns))
+    col_name = input("Enter the name of the column containing text: ").strip()
+    if col_name not in columns:
+        print(f" Column '{col_name}' not found.")
+        return None
+    return col_name
+
+def print_summary(sentiment_counts, total, avg_polarity, avg_subjectivity):
+    # Prints the summary statistics of a CSV analysis
+
+    print("=" * 40)
+    print("📈Summary Statistics")
+    print("=" * 40)
+
+    for sentiment, count in sentiment_counts.items():
+        percentage = (count / total) * 100
+        print(f"{sentiment.capitalize()}: {count} ({percentage:.1f}%)")
+
+    print(f"\nAverage Polarity: {avg_polarity:.4f}")
+    print(f"Average Subjectivity: {avg_subjectivity:.4f}")
+
 def analyze_csv_file(analyzer):
-    # Handling CSV file analysis
+    # Handling CSV file analysis (Parquet and Arrow files are accepted too)
 
-    file_path = input("\n Enter the path to the CSV file: ").strip()
+    import pandas as pd
+    from formats import file_format
+    from streaming import PolarityHistogram
+    from wordfreq import WordFrequencies
+
+    file_path = input("\n Enter the path to the CSV, Parquet or Arrow file: ").strip()
 
     if not os.path.exists(file_path):
         print(f" File not found in: {file_path}")
         return
     
     try:
+        # Big files are streamed so memory stays bounded, and so are columnar
+        # files, which can be read one batch of the text column at a time
+
+        if file_format(file_path) != "csv" or os.path.getsize(file_path) >= STREAM_THRESHOLD_BYTES:
+            analyze_csv_streaming(analyzer, file_path)
+            return
+
         # Reading the CSV file
 
         df = pd.read_csv(file_path)
@@ -55,63 +149,117 @@ def analyze_csv_file(analyzer):
 
         # Checks for text column(s)
         
-        text_columns = [col for col in df.columns if "text" in col.lower() or "comment" in col.lower() or "review" in col.lower()]
-        
-        if not text_columns:
-            print("Available columns: ", list(df.columns))
-            col_name = input("Enter the name of the column containing text: ").strip()
-            if col_name not in df.columns:
-                print(f" Column '{col_name}' not found.")
-                return
-            else:
-                col_name = text_columns[0]
-                print(f"Using column: '{col_name}'")
+        col_name = choose_text_column(df.columns)
+        if col_name is None:
+            return
             
-            # Clean data - remove NaN values
+        # Clean data - remove NaN values
 
-            df = df.dropna(subset = [col_name])
-            texts = df[col_name].astype(str).tolist()
+        df = df.dropna(subset = [col_name])
+        texts = df[col_name].astype(str).tolist()
 
-            print(f" Analyzing {len(texts)} texts.")
+        print(f" Analyzing {len(texts)} texts.")
 
-            # Analyze sentiments
+        # Analyze sentiments, spreading large files over every core
 
-            results = analyzer.analyze_batch(texts)
-            results_df = pd.DataFrame(results)
+        fast_path_rows = analyzer.fast_path_rows
+        results = analyzer.analyze_batch(texts, workers = None)
+        results_df = results.to_dataframe()
+        report_fast_path(analyzer.fast_path_rows - fast_path_rows)
 
-            # Save results
+        # Save results
 
-            output_path = file_path.replace(".csv", "_sentiment_results.csv")
-            results_df.to_csv(output_path, index = False)
-            print(f" Results saved to {output_path}")
+        output_path = file_path.replace(".csv", "_sentiment_results.csv")
+        results_df.to_csv(output_path, index = False)
+        print(f" Results saved to {output_path}")
 
-            # Print summary statistics
-            print("=" * 40)
-            print("📈Summary Statistics")
-            print("=" * 40)
-            sentiment_counts = results_df["sentiment"].value_counts()
+        # Print summary statistics
+        sentiment_counts = results_df["sentiment"].value_counts()
+        sentiment_counts = sentiment_counts[sentiment_counts > 0]
+        print_summary(sentiment_counts, len(results_df),
+                      results_df["polarity"].mean(), results_df["subjectivity"].mean())
 
-            for sentiment, count in sentiment_counts.items():
-                percentage = (count / len(results_df)) * 100
-                print(f"{sentiment.capitalize()}: {count} ({percentage:.1f}%)")
-            
-            print(f"\nAverage Polarity: {results_df["polarity"].mean():.4f}")
-            print(f"Average Subjectivity: {results_df['subjectivity'].mean():.4f}")
+        # Generate visualizations from the word counts of the cleaned text and the binned polarities
+        words = WordFrequencies()
+        words.update(results.cleaned_text)
+        polarity_histogram = PolarityHistogram()
+        polarity_histogram.update(results.polarity)
 
-            # Generate visualizations
-            print("\nGenerating visualizations.")
-            plot_sentiment_distribution(sentiment_counts)
+        draw_charts(sentiment_counts, words.to_dict(), polarity_histogram)
 
-            # Creates word cloud from cleaned text
-            all_text = " ".join([text for text in results_df["cleaned_text"] if text])
-            if all_text.strip():
-                generate_wordcloud(all_text)
-            
-            # Plot polarity distribution
-            plot_polarity_distribution(results_df["polarity"].tolist())
 
-            print("All visualizations saved to 'outputs' folder")
+    except pd.errors.EmptyDataError:
+        print("The CSV file is empty.")
+    except pd.errors.ParserError:
+        print("Error parsing CSV file. Please check file format.")
+    except Exception as e:
+        print(f"Error processing file: {str(e)}")
+
+def analyze_csv_streaming(analyzer, file_path, chunk_size = STREAM_CHUNK_ROWS):
+    # Analyzes a large CSV file, or a Parquet or Arrow file, in fixed-size chunks, appending results as it goes
+    # Results are written in the input's format
+
+    from formats import read_columns, results_path
+    from streaming import analyze_file_stream
+
+    print(f" Streaming {file_path} in chunks of {chunk_size} rows.")
+
+    # Only the header (or schema) is read to find the text column
+    col_name = choose_text_column(read_columns(file_path))
+    if col_name is None:
+        return
+
+    output_path = results_path(file_path)
+    fast_path_rows = analyzer.fast_path_rows
+    stats = analyze_file_stream(analyzer, file_path, col_name, output_path,
+                                chunk_size = chunk_size, workers = None)
+    if stats.total == 0:
+        print(" No text found to analyze.")
+        return
+    report_fast_path(analyzer.fast_path_rows - fast_path_rows)
+    print(f" Results saved to {output_path}")
+
+    sentiment_counts = stats.counts_series()
+    print_summary(sentiment_counts, stats.total, stats.mean_polarity, stats.mean_subjectivity)
+
+    # Only aggregate charts are drawn, the raw rows are no longer in memory
+    draw_charts(sentiment_counts, stats.words.to_dict(), stats.polarity_histogram)
+
+def analyze_csv_incremental_file(analyzer):
+    # Re-analyzes a CSV file analyzed before, scoring only its new or changed rows
+
+    import pandas as pd
+    from incremental import analyze_csv_incremental, store_path_for
+
+    file_path = input("\n Enter the path to the CSV file: ").strip()
+
+    if not os.path.exists(file_path):
+        print(f" File not found in: {file_path}")
+        return
+
+    try:
+        col_name = choose_text_column(pd.read_csv(file_path, nrows = 0).columns)
+        if col_name is None:
+            return
+
+        output_path = file_path.replace(".csv", "_sentiment_results.csv")
+        if not os.path.exists(store_path_for(output_path)):
+            print(" No previous results found, every row will be analyzed.")
+
+        fast_path_rows = analyzer.fast_path_rows
+        stats, scored = analyze_csv_incremental(analyzer, file_path, col_name, output_path,
+                                                chunk_size = STREAM_CHUNK_ROWS, workers = None)
+        if stats.total == 0:
+            print(" No text found to analyze.")
+            return
+        print(f" Analyzed {scored} new or changed rows, reused {stats.total - scored}.")
+        report_fast_path(analyzer.fast_path_rows - fast_path_rows)
+        print(f" Results saved to {output_path}")
 
+        sentiment_counts = stats.counts_series()
+        print_summary(sentiment_counts, stats.total, stats.mean_polarity, stats.mean_subjectivity)
+
+        draw_charts(sentiment_counts, stats.words.to_dict(), stats.polarity_histogram)
 
     except pd.errors.EmptyDataError:
         print("The CSV file is empty.")
@@ -124,9 +272,13 @@ def main():
     # Main app loop
     print_header()
 
-    # Initialize analyzer
+    # Setting SENTIMENT_PROFILE to a file path turns on profiling, each CSV analysis writes its profile there
+    profile_path = os.environ.get("SENTIMENT_PROFILE")
+
+    # Initialize analyzer, caching results so repeated reviews are only scored once
     try:
-        analyzer = SentimentAnalyzer()
+        analyzer = SentimentAnalyzer(cache_size = 10000, backend = "lexicon",
+                                     profile = bool(profile_path), progress = print_progress)
     except Exception as e:
         print(f"Error initializing sentiment analyzer: {e}")
         return
@@ -137,20 +289,25 @@ def main():
         print("-"*30)
         print("1. 📝 Analyze single text")
         print("2. 📊 Analyze CSV file")
-        print("3. 🔴 Exit")
+        print("3. 🔁 Re-analyze CSV file (only new or changed rows)")
+        print("4. 🔴 Exit")
 
         try:
-            choice = input("\nChoose option (1-3): ").strip()
+            choice = input("\nChoose option (1-4): ").strip()
 
             if choice == "1":
                 analyze_single_text(analyzer)
             elif choice == "2":
                 analyze_csv_file(analyzer)
+                report_profile(analyzer, profile_path)
             elif choice == "3":
+                analyze_csv_incremental_file(analyzer)
+                report_profile(analyzer, profile_path)
+            elif choice == "4":
                 print("\nThank you for using my sentiment analyzer!")
                 break
             else:
-                print("Invalid option, please choose 1, 2 or 3.")
+                print("Invalid option, please choose 1, 2, 3 or 4.")
 
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
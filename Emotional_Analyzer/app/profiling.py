@@ -0,0 +1,85 @@
+import json
+import time
+
+# Stages timed by the profiler; cleaning does not include the time spent tokenizing
+STAGES = ("cleaning", "tokenization", "screening", "scoring", "classification")
+# fast_path counts the texts the vocabulary screen scored as neutral without calling the backend
+COUNTERS = ("texts", "duplicates", "cache_hits", "cache_misses", "errors", "cleaning_errors", "block_fallbacks",
+            "fast_path")
+
+class Profiler:
+    # Cumulative time per analysis stage and event counters for a SentimentAnalyzer
+    # Hooks are called as hook(name, value) for every recorded time (in seconds) or count
+
+    def __init__(self):
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def add_time(self, stage, seconds):
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+        for hook in self.hooks:
+            hook(stage, seconds)
+
+    def count(self, name, n = 1):
+        if not n:
+            return
+        self.counts[name] = self.counts.get(name, 0) + n
+        for hook in self.hooks:
+            hook(name, n)
+
+    def timed(self, stage, func, *args):
+        # Calls func(*args), adding its run time to stage
+
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def wrap(self, stage, func):
+        # Returns func with every call timed under stage
+
+        def timed_func(*args):
+            return self.timed(stage, func, *args)
+        return timed_func
+
+    def merge(self, summary):
+        # Adds a summary() taken elsewhere, e.g. in a worker process
+
+        for stage, seconds in summary["times"].items():
+            self.add_time(stage, seconds)
+        for name, n in summary["counts"].items():
+            self.count(name, n)
+
+    def summary(self):
+        # Returns the times and counters as a JSON-ready dict
+
+        return {
+            "times": dict(self.times),
+            "counts": dict(self.counts),
+            "total_seconds": sum(self.times.values())
+        }
+
+    def dump(self, path):
+        # Writes summary() to path as JSON
+
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent = 2)
+
+    def format(self):
+        # Returns a short human-readable report
+
+        total = sum(self.times.values())
+        lines = []
+        for stage, seconds in self.times.items():
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"{stage.capitalize()}: {seconds:.3f}s ({share:.1f}%)")
+        lines.append(", ".join(f"{name.replace('_', ' ')}: {n}" for name, n in self.counts.items()))
+        return "\n".join(lines)
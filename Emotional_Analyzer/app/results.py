@@ -0,0 +1,193 @@
+from collections.abc import Sequence
+import numpy as np
+
+# Category labels, stored in BatchResult as small-int codes (the index into these tuples)
+SENTIMENTS = ('positive', 'negative', 'neutral')
+CONFIDENCES = ('low', 'medium', 'high', 'error')
+
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENTS)}
+CONFIDENCE_CODES = {label: code for code, label in enumerate(CONFIDENCES)}
+
+def classify_codes(polarity):
+    # Vectorized version of analyzer.classify, returning sentiment and confidence codes
+    # Arguments: polarity (ndarray): Unrounded polarity scores
+
+    positive = polarity > 0.1
+    negative = polarity < -0.1
+    sentiment = np.full(len(polarity), SENTIMENT_CODES['neutral'], dtype = np.int8)
+    sentiment[positive] = SENTIMENT_CODES['positive']
+    sentiment[negative] = SENTIMENT_CODES['negative']
+
+    confidence = np.full(len(polarity), CONFIDENCE_CODES['low'], dtype = np.int8)
+    confidence[positive | negative] = CONFIDENCE_CODES['medium']
+    confidence[(polarity > 0.5) | (polarity < -0.5)] = CONFIDENCE_CODES['high']
+    return sentiment, confidence
+
+class BatchResult(Sequence):
+    # Columnar results of a batch analysis
+    # Polarity and subjectivity are float arrays, sentiment and confidence are int8 codes into
+    # SENTIMENTS / CONFIDENCES, and the text columns are only kept when asked for.
+    # Indexing or iterating gives the same dicts analyze_sentiment returns, built on demand.
+
+    def __init__(self, polarity, subjectivity, sentiment, confidence, text = None, cleaned_text = None):
+        self.polarity = polarity
+        self.subjectivity = subjectivity
+        self.sentiment = sentiment
+        self.confidence = confidence
+        self.text = text
+        self.cleaned_text = cleaned_text
+
+    @classmethod
+    def allocate(cls, size, keep_text = True):
+        # Creates a result of the given size, to be filled in row by row or by slices
+
+        return cls(
+            np.zeros(size, dtype = np.float64),
+            np.zeros(size, dtype = np.float64),
+            np.zeros(size, dtype = np.int8),
+            np.zeros(size, dtype = np.int8),
+            [None] * size if keep_text else None,
+            [''] * size if keep_text else None
+        )
+
+    @classmethod
+    def from_records(cls, records, keep_text = True):
+        # Builds a columnar result from a list of result dicts
+
+        result = cls.allocate(len(records), keep_text)
+        for i, record in enumerate(records):
+            result.set_record(i, record)
+        return result
+
+    @property
+    def has_text(self):
+        return self.text is not None
+
+    def set_record(self, i, record):
+        # Writes a result dict into row i
+
+        self.polarity[i] = record['polarity']
+        self.subjectivity[i] = record['subjectivity']
+        self.sentiment[i] = SENTIMENT_CODES[record['sentiment']]
+        self.confidence[i] = CONFIDENCE_CODES[record['confidence']]
+        if self.text is not None:
+            self.text[i] = record['text']
+            self.cleaned_text[i] = record['cleaned_text']
+
+    def set_scores(self, rows, texts, cleaned, polarities, subjectivities):
+        # Writes freshly scored rows, classifying them on the unrounded polarity like analyze_sentiment
+
+        rows = np.asarray(rows, dtype = np.intp)
+        polarities = np.asarray(polarities, dtype = np.float64)
+        sentiment, confidence = classify_codes(polarities)
+
+        # Python's round() keeps the stored values identical to the dict results
+        self.polarity[rows] = [round(p, 4) for p in polarities.tolist()]
+        self.subjectivity[rows] = [round(s, 4) for s in np.asarray(subjectivities, dtype = np.float64).tolist()]
+        self.sentiment[rows] = sentiment
+        self.confidence[rows] = confidence
+        if self.text is not None:
+            for i, text, cleaned_text in zip(rows.tolist(), texts, cleaned):
+                self.text[i] = text
+                self.cleaned_text[i] = cleaned_text
+
+    def set_rows(self, rows, part):
+        # Copies every row of another result into the given rows of this one
+
+        rows = np.asarray(rows, dtype = np.intp)
+        self.polarity[rows] = part.polarity
+        self.subjectivity[rows] = part.subjectivity
+        self.sentiment[rows] = part.sentiment
+        self.confidence[rows] = part.confidence
+        if self.text is not None:
+            for j, i in enumerate(rows.tolist()):
+                self.text[i] = part.text[j]
+                self.cleaned_text[i] = part.cleaned_text[j]
+
+    def take(self, positions):
+        # Returns a new result made of the rows at the given positions
+
+        positions = np.asarray(positions, dtype = np.intp)
+        return BatchResult(
+            self.polarity[positions],
+            self.subjectivity[positions],
+            self.sentiment[positions],
+            self.confidence[positions],
+            [self.text[i] for i in positions] if self.text is not None else None,
+            [self.cleaned_text[i] for i in positions] if self.cleaned_text is not None else None
+        )
+
+    def record(self, i):
+        # Returns row i as a result dict
+
+        record = {}
+        if self.text is not None:
+            record['text'] = self.text[i]
+            record['cleaned_text'] = self.cleaned_text[i]
+        record['polarity'] = float(self.polarity[i])
+        record['subjectivity'] = float(self.subjectivity[i])
+        record['sentiment'] = SENTIMENTS[self.sentiment[i]]
+        record['confidence'] = CONFIDENCES[self.confidence[i]]
+        return record
+
+    def __len__(self):
+        return len(self.polarity)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("BatchResult index out of range")
+        return self.record(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def to_records(self):
+        # Returns the results as a plain list of dicts
+
+        return [self.record(i) for i in range(len(self))]
+
+    def sentiment_counts(self):
+        # Returns {sentiment: count} for the sentiments that occur
+
+        counts = np.bincount(self.sentiment, minlength = len(SENTIMENTS))
+        return {SENTIMENTS[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def to_dataframe(self):
+        # Converts to a DataFrame, sharing the numeric and code arrays instead of copying them
+
+        import pandas as pd
+
+        columns = {}
+        if self.text is not None:
+            columns['text'] = self.text
+            columns['cleaned_text'] = self.cleaned_text
+        columns['polarity'] = self.polarity
+        columns['subjectivity'] = self.subjectivity
+        columns['sentiment'] = pd.Categorical.from_codes(self.sentiment, dtype = pd.CategoricalDtype(SENTIMENTS))
+        columns['confidence'] = pd.Categorical.from_codes(self.confidence, dtype = pd.CategoricalDtype(CONFIDENCES))
+        return pd.DataFrame(columns, copy = False)
+
+    def to_arrow(self):
+        # Converts to a pyarrow Table with typed columns: float64 scores and dictionary-encoded labels
+
+        import pyarrow as pa
+
+        columns = {}
+        if self.text is not None:
+            columns['text'] = pa.array(self.text, type = pa.string())
+            columns['cleaned_text'] = pa.array(self.cleaned_text, type = pa.string())
+        columns['polarity'] = pa.array(self.polarity, type = pa.float64())
+        columns['subjectivity'] = pa.array(self.subjectivity, type = pa.float64())
+        columns['sentiment'] = pa.DictionaryArray.from_arrays(
+            pa.array(self.sentiment, type = pa.int8()), pa.array(SENTIMENTS, type = pa.string()))
+        columns['confidence'] = pa.DictionaryArray.from_arrays(
+            pa.array(self.confidence, type = pa.int8()), pa.array(CONFIDENCES, type = pa.string()))
+        return pa.table(columns)
@@ -0,0 +1,310 @@
+# Long-running sentiment service over a local HTTP/JSON endpoint
+# Usage: python server.py [--port 8765] [--workers N] [--backend lexicon]
+#
+#   GET  /health                              -> {"status": "ok", ...}
+#   POST /analyze  {"text": "..."}            -> one result dict
+#   POST /analyze  {"texts": ["...", ...]}    -> {"results": [result dicts]}
+
+import argparse
+import asyncio
+import json
+import os
+from analyzer import SentimentAnalyzer, analyze_chunk, init_worker
+
+# The service is only meant for local clients
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Concurrent requests arriving within this window are scored together
+BATCH_WINDOW_SECONDS = 0.005
+MAX_BATCH_SIZE = 512
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    # Raised while handling a request to answer it with an error status
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class MicroBatcher:
+    # Collects the texts of concurrent requests and scores them together
+    # score_batch is a coroutine function taking a list of texts and returning a BatchResult
+    # Batches are scored concurrently, in pieces of at most max_batch_size texts, with at most
+    # `concurrency` score_batch calls running at once (one per worker)
+
+    def __init__(self, score_batch, window = BATCH_WINDOW_SECONDS, max_batch_size = MAX_BATCH_SIZE,
+                 concurrency = 1):
+        self.score_batch = score_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+        self._slots = None
+        self._pending = set()
+
+    def start(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in [self._task, *self._pending] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+        self._pending.clear()
+
+    async def submit(self, texts):
+        # Queues texts for scoring and waits for their result dicts, in order
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self):
+        # Waits for one request, then gathers whatever else arrives within the window
+
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.window
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0 and self._queue.empty():
+                break
+            try:
+                item = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        # Starts every batch as its own task, so the next one is gathered while earlier ones score
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.batches += 1
+            task = loop.create_task(self._score_batch(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _score_piece(self, texts):
+        async with self._slots:
+            return await self.score_batch(texts)
+
+    async def _score_batch(self, batch):
+        texts = [text for item_texts, _ in batch for text in item_texts]
+        # A batch bigger than max_batch_size (one large request) is spread over several workers
+        pieces = [texts[start:start + self.max_batch_size]
+                  for start in range(0, len(texts), self.max_batch_size)] or [texts]
+
+        try:
+            parts = await asyncio.gather(*(self._score_piece(piece) for piece in pieces))
+            results = parts[0] if len(parts) == 1 else [result for part in parts for result in part]
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Hand every request back its own slice of the combined result
+        start = 0
+        for item_texts, future in batch:
+            end = start + len(item_texts)
+            if not future.done():
+                future.set_result(results[start:end])
+            start = end
+
+class SentimentServer:
+    # Keeps warm analyzers around and answers analysis requests over HTTP
+    # workers = 0 scores on a thread in this process, otherwise a process pool is used
+
+    def __init__(self, port = DEFAULT_PORT, workers = None, backend = "lexicon", cache_size = 10000,
+                 batch_window = BATCH_WINDOW_SECONDS, max_batch_size = MAX_BATCH_SIZE):
+        self.port = port
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.backend = backend
+        self.cache_size = cache_size
+        self.requests = 0
+        # Threaded scoring shares one analyzer, so only the process pool scores several batches at once
+        self.batcher = MicroBatcher(self._score, batch_window, max_batch_size, concurrency = max(1, self.workers))
+        self._executor = None
+        self._analyzer = None
+        self._server = None
+
+    async def start(self):
+        # Warms up the analyzers and starts listening; returns once the socket is bound
+
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+                                                 initargs = (self.backend, self.cache_size))
+
+            # One task per worker starts every process, and with it init_worker's warm analyzer
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._executor, analyze_chunk, [])
+                                   for _ in range(self.workers)))
+        else:
+            self._analyzer = SentimentAnalyzer(cache_size = self.cache_size, backend = self.backend).warm_up()
+            self._executor = ThreadPoolExecutor(max_workers = 1)
+
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, HOST, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def _score(self, texts):
+        # Runs the CPU-bound scoring off the event loop
+
+        loop = asyncio.get_running_loop()
+        if self._analyzer is not None:
+            return await loop.run_in_executor(self._executor, self._analyzer.analyze_batch, texts)
+        return await loop.run_in_executor(self._executor, analyze_chunk, texts)
+
+    async def _handle_connection(self, reader, writer):
+        # Serves requests on one connection until the client closes it (HTTP/1.1 keep-alive)
+
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._write_response(writer, e.status, {"error": str(e)}, keep_alive = False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = 200, await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"Error analyzing sentiment: {e}"}
+
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # Parses one request, returning None when the client has closed the connection
+
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body is over {MAX_BODY_BYTES} bytes")
+
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET for /health")
+            return {
+                "status": "ok",
+                "backend": self.backend,
+                "workers": self.workers,
+                "requests": self.requests,
+                "batches": self.batcher.batches
+            }
+
+        if path != "/analyze":
+            raise HTTPError(404, f"Unknown path: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Use POST for /analyze")
+
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+        self.requests += 1
+
+        if isinstance(data, dict) and "text" in data:
+            return (await self.batcher.submit([data["text"]]))[0]
+        if isinstance(data, dict) and isinstance(data.get("texts"), list):
+            return {"results": await self.batcher.submit(data["texts"])}
+        raise HTTPError(400, 'Expected {"text": ...} or {"texts": [...]}')
+
+async def run_server(server):
+    await server.start()
+    print(f"Sentiment service listening on http://{HOST}:{server.port} "
+          f"({server.backend} backend, {server.workers} worker(s))")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serve the sentiment analyzer on a local HTTP/JSON endpoint")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    parser.add_argument("--workers", type = int, default = None,
+                        help = "scoring processes (default: one per core, 0 scores in this process)")
+    parser.add_argument("--backend", default = "lexicon", choices = ["lexicon", "textblob"])
+    parser.add_argument("--cache-size", type = int, default = 10000, help = "results cached per analyzer")
+    args = parser.parse_args()
+
+    server = SentimentServer(port = args.port, workers = args.workers, backend = args.backend,
+                             cache_size = args.cache_size)
+    try:
+        asyncio.run(run_server(server))
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from formats import ResultWriter, iter_texts
+from wordfreq import WordFrequencies
+
+# Polarity histograms use fixed bins over the whole score range, so batches can be added up
+POLARITY_BINS = 30
+
+class PolarityHistogram:
+    # Histogram of polarity scores over [-1, 1], filled batch by batch instead of from every row
+
+    def __init__(self, bins = POLARITY_BINS):
+        self.edges = np.linspace(-1.0, 1.0, bins + 1)
+        self.counts = np.zeros(bins, dtype = np.int64)
+
+    def update(self, polarities, weights = None):
+        # weights gives how many times each score occurs, for scores that were counted already
+
+        counts, _ = np.histogram(polarities, bins = self.edges, weights = weights)
+        self.counts += counts.astype(np.int64)
+
+    def merge(self, other):
+        # Adds the counts of a histogram with the same bins
+
+        self.counts += other.counts
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+class SummaryStats:
+    # Running totals for the summary statistics of a CSV analysis
+    # Only counts, sums and a bounded word counter are kept, so memory does not grow with the number of rows
+
+    def __init__(self):
+        self.total = 0
+        self.sentiment_counts = {}
+        self.polarity_sum = 0.0
+        self.subjectivity_sum = 0.0
+        self.words = WordFrequencies()
+        self.polarity_histogram = PolarityHistogram()
+
+    def update(self, results):
+        # Adds a batch of analysis results to the running totals
+        # Arguments: results (BatchResult): Columnar results returned by analyze_batch
+
+        for sentiment, count in results.sentiment_counts().items():
+            self.sentiment_counts[sentiment] = self.sentiment_counts.get(sentiment, 0) + count
+        self.polarity_sum += float(results.polarity.sum())
+        self.subjectivity_sum += float(results.subjectivity.sum())
+        self.total += len(results)
+        self.polarity_histogram.update(results.polarity)
+        if results.has_text:
+            self.words.update(results.cleaned_text)
+
+    def merge(self, other):
+        # Adds the totals of another SummaryStats, e.g. from another file
+
+        for sentiment, count in other.sentiment_counts.items():
+            self.sentiment_counts[sentiment] = self.sentiment_counts.get(sentiment, 0) + count
+        self.polarity_sum += other.polarity_sum
+        self.subjectivity_sum += other.subjectivity_sum
+        self.total += other.total
+        self.polarity_histogram.merge(other.polarity_histogram)
+        self.words.merge(other.words)
+
+    def to_dict(self):
+        # Returns the totals as a JSON-ready dict
+
+        return {
+            "total": self.total,
+            "sentiment_counts": dict(self.sentiment_counts),
+            "mean_polarity": self.mean_polarity,
+            "mean_subjectivity": self.mean_subjectivity
+        }
+
+    @property
+    def mean_polarity(self):
+        return self.polarity_sum / self.total if self.total else 0.0
+
+    @property
+    def mean_subjectivity(self):
+        return self.subjectivity_sum / self.total if self.total else 0.0
+
+    def counts_series(self):
+        # Returns the sentiment counts as a pandas Series ordered like value_counts()
+
+        counts = pd.Series(self.sentiment_counts, dtype = "int64")
+        return counts.sort_values(ascending = False)
+
+def analyze_file_stream(analyzer, file_path, col_name, output_path, chunk_size = 10000, workers = None):
+    # Analyzes a CSV, Parquet or Arrow file chunk by chunk, appending results to output_path as it goes
+    # The formats come from the file extensions, so a CSV can be turned into Parquet results and back
+    # Arguments: analyzer (SentimentAnalyzer): Analyzer used to score the texts
+    #            file_path (str): File to read
+    #            col_name (str): Column holding the text
+    #            output_path (str): File the results are written to
+    #            chunk_size (int): Number of rows read at a time
+    #            workers (int): Worker processes passed on to analyze_batch
+    # Then returns: SummaryStats: Running totals over every analyzed row
+
+    stats = SummaryStats()
+
+    # Only the text column is parsed, and only chunk_size rows are held at once
+    # One worker pool serves every chunk
+    with ResultWriter(output_path) as writer, analyzer.worker_pool(workers):
+        for texts in iter_texts(file_path, col_name, chunk_size):
+            if not texts:
+                continue
+
+            results = analyzer.analyze_batch(texts, workers = workers)
+            stats.update(results)
+            writer.write(results)
+            print(f" Streamed {stats.total} rows to {output_path}")
+
+    return stats
+
+# Name from before Parquet and Arrow files were supported
+analyze_csv_stream = analyze_file_stream
@@ -1,8 +1,12 @@
 import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from wordcloud import STOPWORDS, WordCloud
 import os
 
-def plot_sentiment_distribution(sentiment_counts, output_dir = "ouputs"):
+# Defaults for saved charts; every plotting function takes dpi and image_format ("png", "svg", "pdf", ...)
+CHART_DPI = 300
+CHART_FORMAT = "png"
+
+def plot_sentiment_distribution(sentiment_counts, output_dir = "outputs", dpi = CHART_DPI, image_format = CHART_FORMAT):
     # Generates a bar chart of sentiments distribution
 
     try:
@@ -24,15 +28,15 @@ def plot_sentiment_distribution(sentiment_counts, output_dir = "ouputs"):
             plt.text(bar.get_x() + bar.get_width()/2., height,
                      f"{int(height)}", ha = "center", va ="bottom")
         
-        plt.title("Sentiment Distribution", fontsize = 16, fontheight = "bold")
+        plt.title("Sentiment Distribution", fontsize = 16, fontweight = "bold")
         plt.ylabel("Count", fontsize = 12)
         plt.xlabel("Sentiment", fontsize = 12)
         plt.xticks(rotation = 0)
         plt.grid(axis = "y", alpha = 0.3)        
         plt.tight_layout()
 
-        output_path = os.path.join(output_dir, "sentiment_distribution.png")
-        plt.savefig(output_path, dpi = 300, bbox_inches = "tight")
+        output_path = os.path.join(output_dir, f"sentiment_distribution.{image_format}")
+        plt.savefig(output_path, dpi = dpi, bbox_inches = "tight")
         plt.close()
 
         print(f" Sentiment distribution chart saved to {output_path}")
@@ -41,50 +45,63 @@ def plot_sentiment_distribution(sentiment_counts, output_dir = "ouputs"):
     except Exception as e:
         print(f"Error creating sentiment distribution saved to distribution plot: {e}")
 
-def generate_wordcloud(text, output_dir="outputs"):
-    # Create word cloud from text
+def _new_wordcloud():
+    return WordCloud(
+        width=1200, 
+        height=600, 
+        background_color='white',
+        max_words=100,
+        colormap='viridis',
+        relative_scaling=0.5,
+        min_font_size=10
+    )
+
+def _save_wordcloud(wordcloud, output_dir, dpi = CHART_DPI, image_format = CHART_FORMAT):
+    # Draws a generated word cloud and saves it to output_dir
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    plt.figure(figsize = (15, 8))
+    plt.imshow(wordcloud, interpolation = "bilinear")
+    plt.axis("off")
+    plt.title("Word Cloud - Most Common Words", fontsize = 16, fontweight = "bold", pad = 20)
+    plt.tight_layout(pad = 0)
+
+    output_path = os.path.join(output_dir, f"wordcloud.{image_format}")
+    plt.savefig(output_path, dpi = dpi, bbox_inches = "tight")
+    plt.close()
+
+    print(f" Word cloud saved to: {output_path}")
+    return output_path
+
+def generate_wordcloud_from_frequencies(frequencies, output_dir = "outputs", dpi = CHART_DPI, image_format = CHART_FORMAT):
+    # Create word cloud from precomputed word counts, skipping WordCloud's own tokenizing and counting
+    # Arguments: frequencies (dict): {word: count}, e.g. WordFrequencies.to_dict()
+
     try:
-        if not text or not text.strip():
+        # Same stopword filtering generate() would have applied
+        frequencies = {word: count for word, count in frequencies.items() if word not in STOPWORDS}
+        if not frequencies:
             print("No text available for word cloud generation")
             return None
-            
-        # Create output directory if it doesn't exist (making sure)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        wordcloud = WordCloud(
-            width=1200, 
-            height=600, 
-            background_color='white',
-            max_words=100,
-            colormap='viridis',
-            relative_scaling=0.5,
-            min_font_size=10
-        ).generate(text)
-
-        plt.figure(figsize = (15, 8))
-        plt.imshow(wordcloud, interpolation = "bilienear")
-        plt.axis("off")
-        plt.title("Word Cloud - Most Common Words", fontsize = 16, fontweight = "bold", pad = 20)
-        plt.tight_layout(pad = 0)
-
-        output_path = os.path.join(output_dir, "wordcloud.png")
-        plt.savefig(output_path, dpi = 300, bbox_inches = "tight")
-        plt.close()
 
-        print(f" Word cloud saved to: {output_path}")
+        wordcloud = _new_wordcloud().generate_from_frequencies(frequencies)
+        return _save_wordcloud(wordcloud, output_dir, dpi, image_format)
 
     except Exception as e:
         print(f" Error creating word cloud: {e}")
         return None
 
-def plot_polarity_distribution(polarities, output_dir = "outputs"):
-    # Creates a histogram of polarity scores 
+def plot_polarity_histogram(counts, edges, output_dir = "outputs", dpi = CHART_DPI, image_format = CHART_FORMAT):
+    # Draws the polarity distribution from pre-binned counts instead of the raw scores
+    # Arguments: counts (array): Number of scores in each bin
+    #            edges (array): Bin edges, one more than counts (e.g. PolarityHistogram.edges)
 
     try:
         os.makedirs(output_dir, exist_ok = True)
 
         plt.figure(figsize = (12, 6))
-        plt.hist(polarities, bins = 30, alpha = 0.7, color = "skyblue", edgecolor = "black")
+        plt.stairs(counts, edges, fill = True, alpha = 0.7, color = "skyblue", edgecolor = "black")
         plt.axvline(x = 0, color = "red", linestyle = "--", alpha = 0.7, label = "Neutral (0)")
         plt.title("Distribution of polarity scores", fontsize = 16, fontweight = "bold")
         plt.xlabel("Polarity score", fontsize = 12)
@@ -93,13 +110,45 @@ def plot_polarity_distribution(polarities, output_dir = "outputs"):
         plt.grid(alpha = 0.3)
         plt.tight_layout()
 
-        output_path = os.path.join(output_dir, "polarity_distribution.png")
-        plt.savefig(output_path, dpi = 300, bbox_inches = "tight")
+        output_path = os.path.join(output_dir, f"polarity_distribution.{image_format}")
+        plt.savefig(output_path, dpi = dpi, bbox_inches = "tight")
         plt.close()
 
         print(f" Polarity distribution chart saved to: {output_path}")
         return output_path
-    
+
     except Exception as e:
         print(f" Error when creating polarity distribution plot: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _init_render_worker():
+    # Chart workers never show windows, so they use the non-interactive Agg backend
+
+    plt.switch_backend("Agg")
+
+def render_charts(sentiment_counts = None, word_frequencies = None, polarity_histogram = None,
+                  output_dir = "outputs", dpi = CHART_DPI, image_format = CHART_FORMAT, workers = 3):
+    # Renders the charts from aggregates, each in its own worker process
+    # Arguments: sentiment_counts (Series): Count per sentiment
+    #            word_frequencies (dict): {word: count} for the word cloud
+    #            polarity_histogram (PolarityHistogram): Pre-binned polarity scores
+    #            workers (int): Charts rendered at once, 1 renders them here one after another
+    # Then returns: list: Saved chart paths (None for a chart that failed)
+
+    jobs = []
+    if sentiment_counts is not None and len(sentiment_counts):
+        jobs.append((plot_sentiment_distribution, (sentiment_counts,)))
+    if word_frequencies:
+        jobs.append((generate_wordcloud_from_frequencies, (word_frequencies,)))
+    if polarity_histogram is not None and polarity_histogram.total:
+        jobs.append((plot_polarity_histogram, (polarity_histogram.counts, polarity_histogram.edges)))
+    options = {"output_dir": output_dir, "dpi": dpi, "image_format": image_format}
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [func(*args, **options) for func, args in jobs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers = min(workers, len(jobs)), initializer = _init_render_worker) as executor:
+        futures = [executor.submit(func, *args, **options) for func, args in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,54 @@
+from collections import Counter
+from itertools import islice
+
+# Texts are joined and split this many at a time, so no string grows with the corpus
+COUNT_BLOCK_SIZE = 1000
+
+class WordFrequencies:
+    # Bounded word counter feeding the word cloud, filled text by text as results come in
+    # At most 2 * max_words distinct words are held: past that only the max_words most
+    # frequent are kept. A dropped word that shows up again starts over, so any count can be
+    # short by at most `error`, the sum of the counts dropped at each pruning
+
+    def __init__(self, max_words = 10000):
+        if max_words < 1:
+            raise ValueError("max_words must be at least 1")
+        self.max_words = max_words
+        self.counts = Counter()
+        self.error = 0
+
+    def update(self, texts):
+        # Counts the words of an iterable of cleaned texts (space separated, empty ones skipped)
+
+        texts = iter(texts)
+        while True:
+            block = list(islice(texts, COUNT_BLOCK_SIZE))
+            if not block:
+                break
+            self.counts.update(" ".join(text for text in block if text).split())
+            if len(self.counts) > 2 * self.max_words:
+                self._prune()
+
+    def merge(self, other):
+        # Adds the counts of another WordFrequencies
+
+        self.counts.update(other.counts)
+        self.error += other.error
+        if len(self.counts) > 2 * self.max_words:
+            self._prune()
+
+    def _prune(self):
+        top = self.counts.most_common(self.max_words + 1)
+        self.error += top[-1][1]
+        self.counts = Counter(dict(top[:-1]))
+
+    def most_common(self, n = None):
+        return self.counts.most_common(n)
+
+    def to_dict(self, n = None):
+        # Returns {word: count} for the n most frequent words, as WordCloud.generate_from_frequencies takes
+
+        return dict(self.counts.most_common(n))
+
+    def __len__(self):
+        return len(self.counts)
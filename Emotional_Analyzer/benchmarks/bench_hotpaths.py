@@ -0,0 +1,245 @@
+# Throughput benchmark for the analyzer hot paths on synthetic reviews
+# Every stage runs in a fresh process, so its peak RSS is its own and not the previous stage's
+# Usage: python benchmarks/bench_hotpaths.py [--rows N] [--duplicate-rate R] [--workers N]
+#                                           [--stages clean_text,analyze_batch] [--output FILE]
+#                                           [--baseline FILE --max-regression 0.2]
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+STAGES = ["clean_text", "analyze_sentiment", "analyze_batch", "csv_end_to_end", "visualization"]
+
+_SUBJECTS = ["The product", "This phone", "The delivery", "Customer service", "The battery", "It",
+             "The screen", "This book", "The app", "Shipping", "The price", "The quality"]
+_VERBS = ["is", "was", "seems", "looks", "feels", "turned out"]
+_ADVERBS = ["", "", "really", "very", "not", "extremely", "quite", "somewhat"]
+_ADJECTIVES = ["great", "terrible", "good", "bad", "amazing", "awful", "okay", "fine", "excellent",
+               "poor", "disappointing", "perfect", "slow", "fast", "cheap", "broken", "average"]
+_TAILS = ["", "", "!", " :)", " :(", ", would buy again.", ", never again.", " for the money.",
+          ". Arrived on Tuesday.", ", I don't think I'd recommend it."]
+
+def generate_reviews(size, duplicate_rate = 0.0, seed = 0):
+    # Builds `size` synthetic reviews, roughly duplicate_rate of them copies of earlier ones
+    # Arguments: size (int): Number of reviews
+    #            duplicate_rate (float): Share of reviews repeating an earlier review, 0 to 1
+    #            seed (int): Random seed, so runs compare like for like
+    # Then returns: list: Review strings
+
+    if not 0 <= duplicate_rate <= 1:
+        raise ValueError("duplicate_rate must be between 0 and 1")
+
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(size):
+        if reviews and rng.random() < duplicate_rate:
+            reviews.append(rng.choice(reviews))
+            continue
+
+        words = [rng.choice(_SUBJECTS), rng.choice(_VERBS), rng.choice(_ADVERBS), rng.choice(_ADJECTIVES)]
+        if rng.random() < 0.3:
+            words += ["and", rng.choice(_ADJECTIVES)]
+        # A serial number keeps fresh reviews unique
+        reviews.append(" ".join(w for w in words if w) + rng.choice(_TAILS) + f" #{i}")
+    return reviews
+
+def peak_rss_mb():
+    # Peak resident set size of this process and its finished children, in MB (None where unsupported)
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _timed(breakdown, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    breakdown[name] = time.perf_counter() - start
+    return value
+
+def _bench_clean_text(reviews, backend, workers, breakdown):
+    from utils import clean_text, download_nltk_data
+
+    _timed(breakdown, "setup", download_nltk_data)
+    _timed(breakdown, "run", lambda: [clean_text(text) for text in reviews])
+
+def _bench_analyze_sentiment(reviews, backend, workers, breakdown):
+    from analyzer import SentimentAnalyzer
+
+    analyzer = _timed(breakdown, "setup", lambda: SentimentAnalyzer(backend = backend).warm_up())
+    _timed(breakdown, "run", lambda: [analyzer.analyze_sentiment(text) for text in reviews])
+
+def _bench_analyze_batch(reviews, backend, workers, breakdown):
+    from analyzer import SentimentAnalyzer
+
+    analyzer = _timed(breakdown, "setup", lambda: SentimentAnalyzer(backend = backend).warm_up())
+    _timed(breakdown, "run", analyzer.analyze_batch, reviews, workers = workers)
+
+def _bench_csv_end_to_end(reviews, backend, workers, breakdown):
+    # Mirrors the CLI's whole-file path: read, analyze, write the results file
+
+    import pandas as pd
+    from analyzer import SentimentAnalyzer
+
+    analyzer = _timed(breakdown, "setup", lambda: SentimentAnalyzer(backend = backend).warm_up())
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "reviews.csv")
+        pd.DataFrame({"review": reviews}).to_csv(input_path, index = False)
+
+        start = time.perf_counter()
+        df = _timed(breakdown, "read_csv", pd.read_csv, input_path)
+        texts = df["review"].dropna().astype(str).tolist()
+        results = _timed(breakdown, "analyze_batch", analyzer.analyze_batch, texts, workers = workers)
+        results_df = _timed(breakdown, "to_dataframe", results.to_dataframe)
+        _timed(breakdown, "write_csv", results_df.to_csv,
+               os.path.join(tmp, "reviews_sentiment_results.csv"), index = False)
+        breakdown["run"] = time.perf_counter() - start
+
+def _bench_visualization(reviews, backend, workers, breakdown):
+    # Times the CLI's charts: building the aggregates, then rendering them in parallel
+
+    import pandas as pd
+    from analyzer import SentimentAnalyzer
+    from streaming import PolarityHistogram
+    from visualization import render_charts
+    from wordfreq import WordFrequencies
+
+    results = _timed(breakdown, "setup", lambda: SentimentAnalyzer(backend = backend).warm_up()
+                     .analyze_batch(reviews, workers = workers))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        sentiment_counts = _timed(breakdown, "sentiment_counts", lambda: pd.Series(results.sentiment_counts()))
+        words = WordFrequencies()
+        _timed(breakdown, "word_counts", words.update, results.cleaned_text)
+        polarity_histogram = PolarityHistogram()
+        _timed(breakdown, "polarity_histogram", polarity_histogram.update, results.polarity)
+        _timed(breakdown, "render", render_charts, sentiment_counts, words.to_dict(), polarity_histogram, output_dir = tmp)
+        breakdown["run"] = time.perf_counter() - start
+
+_STAGE_FUNCS = {
+    "clean_text": _bench_clean_text,
+    "analyze_sentiment": _bench_analyze_sentiment,
+    "analyze_batch": _bench_analyze_batch,
+    "csv_end_to_end": _bench_csv_end_to_end,
+    "visualization": _bench_visualization
+}
+
+@contextlib.contextmanager
+def _stdout_to_stderr():
+    # Sends whatever a stage prints (render_charts reports every chart it saves) to stderr, so
+    # stdout carries only the JSON report. fd 1 is redirected too, for the worker processes a stage starts
+
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    finally:
+        sys.stderr.flush()
+        os.dup2(saved_fd, 1)
+        os.close(saved_fd)
+
+def run_stage(stage, rows, duplicate_rate = 0.0, seed = 0, backend = "lexicon", workers = 1):
+    # Runs one stage in this process
+    # Returns: dict: rows, run seconds, rows per second, peak RSS and the per-step breakdown in seconds
+
+    if stage not in _STAGE_FUNCS:
+        raise ValueError(f"Unknown stage '{stage}'. Choose from: {', '.join(STAGES)}")
+
+    reviews = generate_reviews(rows, duplicate_rate, seed)
+    breakdown = {}
+    with _stdout_to_stderr():
+        _STAGE_FUNCS[stage](reviews, backend, workers, breakdown)
+
+    seconds = breakdown.pop("run")
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_s": rows / seconds if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "breakdown": breakdown
+    }
+
+def measure_stage(stage, rows, duplicate_rate = 0.0, seed = 0, backend = "lexicon", workers = 1):
+    # Runs one stage in a freshly spawned process and returns its run_stage report
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_stage, stage, rows, duplicate_rate, seed, backend, workers).result()
+
+def find_regressions(report, baseline, max_regression):
+    # Lists the stages whose throughput dropped more than max_regression (a fraction) below baseline
+
+    regressions = []
+    for stage, result in report["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("rows_per_s")
+        after = result.get("rows_per_s")
+        if before and after is not None and after < before * (1 - max_regression):
+            regressions.append(f"{stage}: {after:.0f} rows/s is {1 - after / before:.0%} below the baseline {before:.0f} rows/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure analyzer throughput stage by stage")
+    parser.add_argument("--rows", type = int, default = 10000, help = "synthetic reviews per stage")
+    parser.add_argument("--duplicate-rate", type = float, default = 0.3, help = "share of repeated reviews, 0 to 1")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--backend", default = "lexicon", choices = ["lexicon", "textblob"])
+    parser.add_argument("--workers", type = int, default = 1, help = "worker processes for analyze_batch")
+    parser.add_argument("--stages", default = ",".join(STAGES), help = "comma separated stages to run")
+    parser.add_argument("--output", default = None, help = "also write the JSON report to this file")
+    parser.add_argument("--baseline", default = None, help = "JSON report of an earlier run to compare against")
+    parser.add_argument("--max-regression", type = float, default = 0.2,
+                        help = "fail when a stage's rows/s drops more than this fraction below the baseline")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in _STAGE_FUNCS]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    report = {
+        "config": {
+            "rows": args.rows,
+            "duplicate_rate": args.duplicate_rate,
+            "seed": args.seed,
+            "backend": args.backend,
+            "workers": args.workers,
+            "python": sys.version.split()[0]
+        },
+        "stages": {stage: measure_stage(stage, args.rows, args.duplicate_rate, args.seed,
+                                        args.backend, args.workers) for stage in stages}
+    }
+
+    output = json.dumps(report, indent = 2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(regression, file = sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# Startup-time benchmark for the sentiment analyzer CLI
+# Every scenario runs in a fresh interpreter, so import costs are measured the way a cron run pays them
+# Usage: python benchmarks/bench_startup.py [--repeat N] [--max-ms MS]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+# Modules that must not be imported before the code path that needs them runs
+HEAVY_MODULES = ["nltk", "textblob", "numpy", "pandas", "matplotlib", "wordcloud"]
+
+SCENARIOS = {
+    "construct_analyzer": "from analyzer import SentimentAnalyzer; SentimentAnalyzer(cache_size = 10000, backend = 'lexicon')",
+    "import_cli": "import main"
+}
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"elapsed_ms": elapsed * 1000, "heavy_modules": heavy}}))
+"""
+
+def measure_startup(code, repeat = 5):
+    # Runs code in `repeat` fresh interpreters
+    # Returns: dict: median/min in-process time, median wall time and the heavy modules that got imported
+
+    in_process = []
+    wall = []
+    heavy = set()
+    for _ in range(repeat):
+        child = _CHILD.format(app_dir = APP_DIR, code = code, heavy = HEAVY_MODULES)
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", child], capture_output = True, text = True, check = True)
+        wall.append((time.perf_counter() - start) * 1000)
+
+        report = json.loads(output.stdout.strip().splitlines()[-1])
+        in_process.append(report["elapsed_ms"])
+        heavy.update(report["heavy_modules"])
+
+    return {
+        "median_ms": statistics.median(in_process),
+        "min_ms": min(in_process),
+        "median_wall_ms": statistics.median(wall),
+        "heavy_modules": sorted(heavy)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure analyzer and CLI startup time")
+    parser.add_argument("--repeat", type = int, default = 5, help = "fresh interpreters per scenario")
+    parser.add_argument("--max-ms", type = float, default = None,
+                        help = "fail when a scenario's median in-process time exceeds this")
+    args = parser.parse_args()
+
+    results = {name: measure_startup(code, args.repeat) for name, code in SCENARIOS.items()}
+    print(json.dumps(results, indent = 2))
+
+    failed = False
+    for name, result in results.items():
+        if result["heavy_modules"]:
+            print(f"{name}: imported heavy modules eagerly: {', '.join(result['heavy_modules'])}", file = sys.stderr)
+            failed = True
+        if args.max_ms is not None and result["median_ms"] > args.max_ms:
+            print(f"{name}: median {result['median_ms']:.1f} ms is over the {args.max_ms} ms budget", file = sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,37 @@
 import unittest
 import sys
 import os
+import tempfile
+import asyncio
+import http.client
+import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
 
 # Add the current directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# The app modules import each other as top-level modules (they are run from app/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
 
-from app.analyzer import SentimentAnalyzer
+from analyzer import SentimentAnalyzer
+from backends import LexiconBackend, TextBlobBackend
+from batch import analyze_files, find_input_files
+from cache import ResultCache
+from profiling import STAGES, Profiler
+from incremental import analyze_csv_incremental, store_path_for
+from results import BatchResult
+from server import MicroBatcher, SentimentServer
+from formats import read_columns, results_path
+from streaming import PolarityHistogram, analyze_csv_stream, analyze_file_stream
+from wordfreq import WordFrequencies
+from utils import TextCleaner, clean_batch, clean_text, tokenize_normalized
+from benchmarks.bench_startup import SCENARIOS, measure_startup
+from benchmarks.bench_hotpaths import find_regressions, generate_reviews, run_stage
 
 class TestSentimentAnalyzer(unittest.TestCase):
     
@@ -116,10 +142,34 @@ class TestSentimentAnalyzer(unittest.TestCase):
         
         self.assertEqual(len(results), len(texts))
         
-        expected_sentiments = ['positive', 'negative', 'neutral', 'positive']
+        # TextBlob scores "okay" and "special" as positive, so the third text is mildly positive (0.43)
+        expected_sentiments = ['positive', 'negative', 'positive', 'positive']
         for i, result in enumerate(results):
             self.assertEqual(result['sentiment'], expected_sentiments[i])
     
+    def test_parallel_batch_matches_serial(self):
+        """Test that the process-pool batch mode keeps input order and results"""
+        texts = [
+            "I love this product!",
+            "This is terrible.",
+            "It's okay, nothing special.",
+            "Amazing experience!",
+            "",
+            None,
+            "The delivery was late and the box was damaged."
+        ] * 3
+
+        serial = self.analyzer.analyze_batch(texts)
+        parallel = self.analyzer.analyze_batch(texts, workers=2, chunk_size=4)
+
+        self.assertEqual(len(parallel), len(texts))
+        self.assertEqual(parallel, serial)
+
+    def test_batch_rejects_bad_chunk_size(self):
+        """Test that a chunk size below one is refused"""
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_batch(["text"], chunk_size=0)
+
     def test_confidence_levels(self):
         """Test confidence level assignment"""
         # High confidence positive
@@ -133,13 +183,764 @@ class TestSentimentAnalyzer(unittest.TestCase):
         # Test that confidence is assigned
         self.assertIn(result['confidence'], ['low', 'medium', 'high'])
 
+class TestLexiconBackend(unittest.TestCase):
+    # The vectorized backend must reproduce the TextBlob backend exactly
+
+    TEST_CASE_TEXTS = [
+        "I love this! It's amazing and wonderful.",
+        "This is fantastic and great!",
+        "Excellent work, I'm very happy with this.",
+        "I hate this! It's terrible and awful.",
+        "This is horrible and disgusting!",
+        "Worst experience ever, completely disappointed.",
+        "This is a pencil.",
+        "The weather is cloudy today.",
+        "I went to the store.",
+        "This is a test sentence.",
+        "I love this product!",
+        "This is terrible.",
+        "It's okay, nothing special.",
+        "Amazing experience!",
+        "This is absolutely amazing and wonderful!",
+        "This is absolutely terrible and horrible!",
+        "",
+        None,
+        123
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.textblob_analyzer = SentimentAnalyzer(backend="textblob")
+        cls.lexicon_analyzer = SentimentAnalyzer(backend="lexicon")
+
+    def assert_same_results(self, texts):
+        expected = self.textblob_analyzer.analyze_batch(texts)
+        actual = self.lexicon_analyzer.analyze_batch(texts)
+        for text, want, got in zip(texts, expected, actual):
+            with self.subTest(text=text):
+                self.assertEqual(got, want)
+
+    def test_parity_on_review_csv(self):
+        """Test the lexicon backend against TextBlob on data/review.csv"""
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "review.csv")
+        self.assert_same_results(pd.read_csv(path)["review"].astype(str).tolist())
+
+    def test_parity_on_test_cases(self):
+        """Test the lexicon backend against TextBlob on the analyzer test cases"""
+        self.assert_same_results(self.TEST_CASE_TEXTS)
+        for text in self.TEST_CASE_TEXTS:
+            with self.subTest(text=text):
+                self.assertEqual(self.lexicon_analyzer.analyze_sentiment(text),
+                                 self.textblob_analyzer.analyze_sentiment(text))
+
+    def test_parity_on_cleaned_text(self):
+        """Test the vectorized path, including adverbs modifying the next word"""
+        texts = [
+            "love product amazing",
+            "really good service",
+            "extremely bad really slow delivery",
+            "absolutely terrible horribly slow",
+            "product box arrived tuesday",
+            "quite nice",
+            "o_o weird packaging",
+            "_awful_ service",
+            "good_",
+            "__great__ value",
+            "happy"
+        ]
+        expected = TextBlobBackend().score_batch(texts)
+        polarities, subjectivities = LexiconBackend().score_batch(texts)
+        self.assertEqual(list(polarities), expected[0])
+        self.assertEqual(list(subjectivities), expected[1])
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is refused"""
+        with self.assertRaises(ValueError):
+            SentimentAnalyzer(backend="vader")
+
+class TestFastPath(unittest.TestCase):
+    # Texts the vocabulary screen rules out must score exactly what the backend would give them
+
+    UNSCORABLE_TEXTS = ["😀😀🔥", "12345 67890", "Das Produkt ist sehr schön", "日本語のレビュー", "#42 / 1000", "???"]
+    # Emoticons and "(!)" only count when cleaning leaves nothing and the original text is scored
+    SCORABLE_TEXTS = ["I love it 😀", "Good", ":)", ":-( :-(", "nice (!)", "(!)", "good_", "So great!!!",
+                      "not bad at all"]
+
+    @staticmethod
+    def full_path_result(backend, text):
+        cleaned = clean_text(text)
+        polarity, subjectivity = backend.score(cleaned if cleaned else text)
+        return polarity, subjectivity
+
+    def test_screen_matches_backends(self):
+        """Test that screened-out texts score 0 and scorable ones are never screened out"""
+        for backend in (TextBlobBackend(), LexiconBackend()):
+            for text in self.UNSCORABLE_TEXTS:
+                with self.subTest(backend=backend.name, text=text):
+                    self.assertFalse(backend.screen.is_scorable(clean_text(text), text))
+                    self.assertEqual(self.full_path_result(backend, text), (0.0, 0.0))
+            for text in self.SCORABLE_TEXTS:
+                with self.subTest(backend=backend.name, text=text):
+                    self.assertTrue(backend.screen.is_scorable(clean_text(text), text))
+
+    def test_screen_on_random_texts(self):
+        """Test that random mixes of words, emoji, numbers and punctuation never lose a score"""
+        import random
+        backend = TextBlobBackend()
+        pieces = ["the", "product", "das", "ist", "good", "awful", "not", "very", "😀", "🔥", "123", ":)",
+                  "<3", "(!)", "!", "?", "-", "'", "_", "^_^", "don't", "café", "well-known", "#", "@"]
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice(pieces) + rng.choice([" ", "", ".", "-", "_"]) for _ in range(rng.randint(1, 4)))
+            if not backend.screen.is_scorable(clean_text(text), text):
+                with self.subTest(text=text):
+                    self.assertEqual(self.full_path_result(backend, text), (0.0, 0.0))
+
+    def test_fast_path_results_and_count(self):
+        """Test that batch and single-text fast path results match the full path and are counted"""
+        texts = self.UNSCORABLE_TEXTS + self.SCORABLE_TEXTS + self.UNSCORABLE_TEXTS[:2]
+        for backend in ("textblob", "lexicon"):
+            analyzer = SentimentAnalyzer(backend=backend, profile=True)
+            results = analyzer.analyze_batch(texts)
+            # Duplicates are only scored once
+            self.assertEqual(analyzer.fast_path_rows, len(self.UNSCORABLE_TEXTS))
+            self.assertEqual(analyzer.profile_summary()["counts"]["fast_path"], len(self.UNSCORABLE_TEXTS))
+
+            for text, result in zip(texts, results):
+                with self.subTest(backend=backend, text=text):
+                    polarity, subjectivity = self.full_path_result(analyzer.backend, text)
+                    self.assertEqual(result["polarity"], round(polarity, 4))
+                    self.assertEqual(result["subjectivity"], round(subjectivity, 4))
+                    self.assertEqual(result, analyzer.analyze_sentiment(text))
+            # Without a cache every analyze_sentiment call goes through the screen again
+            self.assertEqual(analyzer.fast_path_rows, len(self.UNSCORABLE_TEXTS) + len(self.UNSCORABLE_TEXTS) + 2)
+
+    def test_parallel_fast_path_count(self):
+        """Test that fast path rows counted in worker processes reach the parent"""
+        texts = [f"{text} {i}" for i in range(30) for text in ("😀", "great")]
+        analyzer = SentimentAnalyzer(backend="lexicon")
+        analyzer.analyze_batch(texts, workers=2, chunk_size=10)
+        self.assertEqual(analyzer.fast_path_rows, 30)
+
+class TestProfiling(unittest.TestCase):
+
+    texts = ["I love it!", "Awful, broken on arrival.", "I love it!", "", "It is a box."] * 30
+
+    def test_off_by_default(self):
+        """Test that profiling is off unless asked for and does not change results"""
+        analyzer = SentimentAnalyzer()
+        self.assertIsNone(analyzer.profiler)
+        self.assertIsNone(analyzer.profile_summary())
+        self.assertEqual(SentimentAnalyzer(profile=True).analyze_batch(self.texts), analyzer.analyze_batch(self.texts))
+
+    def test_stage_times_and_counters(self):
+        """Test that batch and single-text runs record every stage and the cache counters"""
+        analyzer = SentimentAnalyzer(cache_size=100, profile=True)
+        analyzer.analyze_batch(self.texts)
+        analyzer.analyze_sentiment("I love it!")
+
+        summary = analyzer.profile_summary()
+        self.assertEqual(set(summary["times"]), set(STAGES))
+        self.assertTrue(all(seconds > 0 for seconds in summary["times"].values()))
+        self.assertEqual(summary["counts"]["texts"], len(self.texts))
+        self.assertEqual(summary["counts"]["duplicates"], len(self.texts) - 4)
+        self.assertEqual(summary["counts"]["cache_misses"], 3)
+        self.assertEqual(summary["counts"]["cache_hits"], 1)
+        self.assertAlmostEqual(summary["total_seconds"], sum(summary["times"].values()))
+
+    def test_parallel_profiles_are_merged(self):
+        """Test that worker profiles come back to the parent"""
+        analyzer = SentimentAnalyzer(profile=True)
+        analyzer.analyze_batch([f"{text} {i}" for i, text in enumerate(self.texts)], workers=2, chunk_size=40)
+        self.assertGreater(analyzer.profile_summary()["times"]["scoring"], 0)
+
+    def test_hooks_and_dump(self):
+        """Test that hooks see every event and the summary dumps as JSON"""
+        profiler = Profiler()
+        events = []
+        profiler.add_hook(lambda name, value: events.append(name))
+        profiler.timed("scoring", sum, [1, 2])
+        profiler.count("errors", 2)
+        self.assertEqual(events, ["scoring", "errors"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profiler.dump(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["counts"]["errors"], 2)
+
+    def test_progress_callback(self):
+        """Test that progress goes to the callback and not to stdout"""
+        calls = []
+        analyzer = SentimentAnalyzer(progress=lambda done, total: calls.append((done, total)))
+        texts = [f"review number {i}" for i in range(250)]
+        analyzer.analyze_batch(texts)
+        self.assertEqual(calls, [(100, 250), (200, 250), (250, 250)])
+
+class TestBatchResult(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = SentimentAnalyzer()
+        cls.texts = ["I love this product!", "This is terrible.", None, "I love this product!", "It is a box."]
+
+    def test_columns_match_records(self):
+        """Test that the columnar result reads back as the per-text dicts"""
+        results = self.analyzer.analyze_batch(self.texts)
+
+        self.assertIsInstance(results, BatchResult)
+        self.assertEqual(results.polarity.dtype.kind, "f")
+        self.assertEqual(results.sentiment.dtype.itemsize, 1)
+        self.assertEqual(results.to_records(), [self.analyzer.analyze_sentiment(t) for t in self.texts])
+        self.assertEqual(results[-1], results.to_records()[-1])
+        self.assertEqual(results[1:3], results.to_records()[1:3])
+        self.assertEqual(BatchResult.from_records(results.to_records()), results)
+
+    def test_without_text_columns(self):
+        """Test that keep_text=False drops the text columns but keeps the scores"""
+        full = self.analyzer.analyze_batch(self.texts)
+        compact = self.analyzer.analyze_batch(self.texts, keep_text=False)
+
+        self.assertIsNone(compact.text)
+        self.assertNotIn("text", compact[0])
+        self.assertEqual(list(compact.polarity), list(full.polarity))
+        self.assertEqual([r["sentiment"] for r in compact], [r["sentiment"] for r in full])
+
+    def test_dataframe_shares_arrays(self):
+        """Test that the DataFrame view reuses the result arrays instead of copying them"""
+        results = self.analyzer.analyze_batch(self.texts, keep_text=False)
+        df = results.to_dataframe()
+
+        self.assertEqual(list(df.columns), ["polarity", "subjectivity", "sentiment", "confidence"])
+        self.assertTrue(np.shares_memory(df["polarity"].to_numpy(), results.polarity))
+        self.assertTrue(np.shares_memory(df["sentiment"].array.codes, results.sentiment))
+        self.assertEqual(df["sentiment"].astype(str).tolist(), [r["sentiment"] for r in results])
+
+class TestResultCache(unittest.TestCase):
+
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted and lookups are counted"""
+        cache = ResultCache(max_size=2)
+        cache.put("a", {"polarity": 0.1})
+        cache.put("b", {"polarity": 0.2})
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", {"polarity": 0.3})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_invalid_size(self):
+        """Test that a cache must hold at least one entry"""
+        with self.assertRaises(ValueError):
+            ResultCache(max_size=0)
+
+    def test_analyzer_cache_hits(self):
+        """Test that repeated texts are served from the cache with identical results"""
+        analyzer = SentimentAnalyzer(cache_size=100)
+        first = analyzer.analyze_sentiment("Great product")
+        first["sentiment"] = "changed"
+        second = analyzer.analyze_sentiment("Great product")
+
+        self.assertEqual(second["sentiment"], "positive")
+        self.assertEqual(analyzer.cache_info()["hits"], 1)
+        self.assertEqual(analyzer.cache_info()["misses"], 1)
+        self.assertIsNone(SentimentAnalyzer().cache_info())
+
+    def test_batch_dedupes_before_scoring(self):
+        """Test that a batch scores each distinct text once and keeps input order"""
+        analyzer = SentimentAnalyzer(cache_size=100)
+        texts = ["Great product", "Would not recommend", "Great product", None, None, "Great product"]
+        results = analyzer.analyze_batch(texts)
+
+        self.assertEqual([r["text"] for r in results], texts)
+        self.assertEqual(results[0], results[2])
+        self.assertIsNot(results[0], results[2])
+        # Two distinct strings were scored, the None entries never reach the cache
+        self.assertEqual(analyzer.cache_info()["misses"], 2)
+        self.assertEqual(analyzer.cache_info()["hits"], 0)
+
+class TestTextCleaner(unittest.TestCase):
+
+    def test_fast_tokenizer_matches_treebank(self):
+        """Test that the fast tokenizer splits normalized text like nltk's Treebank tokenizer"""
+        from nltk.tokenize.destructive import NLTKWordTokenizer
+
+        treebank = NLTKWordTokenizer()
+        cleaner = TextCleaner()
+        texts = [
+            "I cannot believe it's GONNA rain, wanna bet?",
+            "Gimme the box; lemme see... we gotta go!",
+            "Café déjà-vu: 100% great_value ２３",
+            "   spaced\tout\n\ntext   ",
+            ""
+        ]
+
+        for text in texts:
+            with self.subTest(text=text):
+                normalized = cleaner.normalize(text)
+                self.assertEqual(tokenize_normalized(normalized), treebank.tokenize(normalized))
+
+    def test_clean_batch_matches_clean_text(self):
+        """Test that batch cleaning gives the same output as cleaning one text at a time"""
+        texts = ["I LOVE this product! It's AMAZING!", None, "", 42, "We gotta try it"]
+        self.assertEqual(clean_batch(texts), [clean_text(text) for text in texts])
+
+class TestLazyStartup(unittest.TestCase):
+
+    def test_startup_imports_nothing_heavy(self):
+        """Test that building an analyzer and importing the CLI defer nltk, textblob, pandas and matplotlib"""
+        for name, code in SCENARIOS.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(measure_startup(code, repeat=1)["heavy_modules"], [])
+
+    def test_warm_up_loads_backend_once(self):
+        """Test that the backend is created on first use and then reused"""
+        analyzer = SentimentAnalyzer(backend="lexicon")
+        self.assertIsNone(analyzer._backend)
+        backend = analyzer.warm_up().backend
+        analyzer.analyze_sentiment("Great product")
+        self.assertIs(analyzer.backend, backend)
+
+class TestHotpathBenchmark(unittest.TestCase):
+
+    def test_generator_is_seeded_and_duplicates(self):
+        """Test that synthetic reviews are reproducible and honour the duplicate rate"""
+        self.assertEqual(generate_reviews(200, 0.5, seed=1), generate_reviews(200, 0.5, seed=1))
+        self.assertEqual(len(set(generate_reviews(200, 0.0))), 200)
+        self.assertLess(len(set(generate_reviews(1000, 0.5))), 700)
+        with self.assertRaises(ValueError):
+            generate_reviews(10, 1.5)
+
+    def test_stage_report(self):
+        """Test that a stage reports throughput, memory and a breakdown"""
+        report = run_stage("analyze_batch", 50, duplicate_rate=0.2)
+        self.assertEqual(report["rows"], 50)
+        self.assertGreater(report["rows_per_s"], 0)
+        self.assertIn("setup", report["breakdown"])
+        with self.assertRaises(ValueError):
+            run_stage("nope", 10)
+
+    def test_report_is_the_only_stdout(self):
+        """Test that what the stages print doesn't end up in the JSON report on stdout"""
+        import subprocess
+
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "bench_hotpaths.py")
+        output = subprocess.run([sys.executable, script, "--rows", "50", "--stages", "visualization"],
+                                capture_output=True, text=True, check=True)
+        report = json.loads(output.stdout)
+        self.assertIn("visualization", report["stages"])
+        self.assertIn("saved", output.stderr)
+
+    def test_find_regressions(self):
+        """Test that only stages slower than the allowed margin are flagged"""
+        baseline = {"stages": {"clean_text": {"rows_per_s": 1000}, "analyze_batch": {"rows_per_s": 1000}}}
+        report = {"stages": {"clean_text": {"rows_per_s": 900}, "analyze_batch": {"rows_per_s": 700}}}
+        regressions = find_regressions(report, baseline, 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("analyze_batch"))
+
+class TestSentimentServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The server runs on its own event loop thread, the test talks to it over HTTP
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        cls.server = SentimentServer(port=0, workers=0, backend="lexicon", batch_window=0.05)
+        asyncio.run_coroutine_threadsafe(cls.server.start(), cls.loop).result(timeout=30)
+        cls.analyzer = SentimentAnalyzer(backend="lexicon")
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.close(), cls.loop).result(timeout=30)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+
+    def request(self, method, path, payload=None, raw=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=30)
+        body = raw if raw is not None else (json.dumps(payload) if payload is not None else None)
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        data = json.loads(response.read())
+        connection.close()
+        return response.status, data
+
+    def test_health(self):
+        """Test the health endpoint"""
+        status, data = self.request("GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["status"], "ok")
+        self.assertEqual(data["backend"], "lexicon")
+
+    def test_single_and_batch(self):
+        """Test that single texts and batches come back like the in-process analyzer"""
+        status, data = self.request("POST", "/analyze", {"text": "I love this product!"})
+        self.assertEqual(status, 200)
+        self.assertEqual(data, self.analyzer.analyze_sentiment("I love this product!"))
+
+        texts = ["I love this product!", "This is terrible.", None, "It's okay, nothing special."]
+        status, data = self.request("POST", "/analyze", {"texts": texts})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["results"], self.analyzer.analyze_batch(texts).to_records())
+
+    def test_concurrent_requests(self):
+        """Test that concurrent clients each get their own results back"""
+        texts = [f"Review number {i} was great" if i % 2 else f"Review {i} was awful" for i in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(lambda text: self.request("POST", "/analyze", {"text": text}), texts))
+
+        for text, (status, data) in zip(texts, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual(data["text"], text)
+
+    def test_bad_requests(self):
+        """Test the error statuses"""
+        self.assertEqual(self.request("POST", "/analyze", raw="not json")[0], 400)
+        self.assertEqual(self.request("POST", "/analyze", {"texts": "not a list"})[0], 400)
+        self.assertEqual(self.request("GET", "/analyze")[0], 405)
+        self.assertEqual(self.request("GET", "/missing")[0], 404)
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_concurrent_submissions_share_one_batch(self):
+        """Test that requests queued together are scored in a single call and split back in order"""
+        calls = []
+
+        async def score(texts):
+            calls.append(list(texts))
+            return [text.upper() for text in texts]
+
+        async def run():
+            batcher = MicroBatcher(score, window=0.05)
+            batcher.start()
+            try:
+                return await asyncio.gather(batcher.submit(["a", "b"]), batcher.submit(["c"]), batcher.submit(["d", "e"]))
+            finally:
+                await batcher.stop()
+
+        self.assertEqual(asyncio.run(run()), [["A", "B"], ["C"], ["D", "E"]])
+        self.assertEqual(calls, [["a", "b", "c", "d", "e"]])
+
+    def test_batches_score_concurrently_and_large_ones_split(self):
+        """Test that batches overlap up to the concurrency limit and big requests are split across calls"""
+        calls = []
+        running = 0
+        peak = 0
+
+        async def score(texts):
+            nonlocal running, peak
+            calls.append(len(texts))
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            return [text.upper() for text in texts]
+
+        async def run():
+            batcher = MicroBatcher(score, window=0, max_batch_size=4, concurrency=3)
+            batcher.start()
+            try:
+                texts = [f"t{i}" for i in range(10)]
+                return await asyncio.gather(batcher.submit(texts), batcher.submit(["x"]), batcher.submit(["y"]))
+            finally:
+                await batcher.stop()
+
+        big, x, y = asyncio.run(run())
+        self.assertEqual(big, [f"T{i}" for i in range(10)])
+        self.assertEqual((x, y), (["X"], ["Y"]))
+        self.assertTrue(all(n <= 4 for n in calls))
+        self.assertEqual(sum(calls), 12)
+        self.assertEqual(peak, 3)
+
+class TestWordFrequencies(unittest.TestCase):
+
+    def test_counts_match_joined_text(self):
+        """Test that incremental counts equal counting one joined string"""
+        texts = ["love product amazing", "", "terrible product", None, "love love"] * 500
+        words = WordFrequencies()
+        words.update(texts)
+        expected = Counter(" ".join(text for text in texts if text).split())
+        self.assertEqual(words.to_dict(), dict(expected))
+        self.assertEqual(words.error, 0)
+
+    def test_memory_is_bounded(self):
+        """Test that rare words are pruned while frequent ones keep exact counts"""
+        texts = [f"common rare{i}" for i in range(10000)]
+        words = WordFrequencies(max_words=100)
+        words.update(texts)
+        self.assertLessEqual(len(words), 200)
+        self.assertEqual(words.most_common(1), [("common", 10000)])
+        with self.assertRaises(ValueError):
+            WordFrequencies(max_words=0)
+
+class TestCharts(unittest.TestCase):
+
+    def test_histogram_matches_numpy(self):
+        """Test that batch-by-batch binning equals one histogram over every score"""
+        polarities = np.random.default_rng(0).uniform(-1, 1, 1000)
+        polarities[:3] = [-1.0, 0.0, 1.0]
+        histogram = PolarityHistogram()
+        for start in range(0, len(polarities), 128):
+            histogram.update(polarities[start:start + 128])
+        expected, _ = np.histogram(polarities, bins=histogram.edges)
+        self.assertEqual(histogram.counts.tolist(), expected.tolist())
+        self.assertEqual(histogram.total, len(polarities))
+
+    def test_render_from_aggregates(self):
+        """Test that charts render from aggregates in the requested format, serially and in parallel"""
+        from visualization import render_charts
+
+        histogram = PolarityHistogram()
+        histogram.update([-0.5, 0.0, 0.2, 0.9])
+        counts = pd.Series({"positive": 2, "neutral": 1, "negative": 1})
+
+        for workers in (1, 2):
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = render_charts(counts, polarity_histogram=histogram, output_dir=tmp,
+                                      dpi=20, image_format="svg", workers=workers)
+                self.assertEqual([os.path.basename(path) for path in paths],
+                                 ["sentiment_distribution.svg", "polarity_distribution.svg"])
+                self.assertTrue(all(os.path.exists(path) for path in paths))
+
+class TestBatchMode(unittest.TestCase):
+
+    def test_files_match_single_analysis(self):
+        """Test that a pool of file workers writes every result file and merges the totals"""
+        shards = [["I love it!", "Awful, broken on arrival."], ["It is a box.", None, "Great value"], ["Terrible"] * 3]
+        analyzer = SentimentAnalyzer()
+        expected = analyzer.analyze_batch([text for shard in shards for text in shard if text is not None])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, shard in enumerate(shards):
+                pd.DataFrame({"id": range(len(shard)), "comment": shard}).to_csv(os.path.join(tmp, f"shard{i}.csv"), index=False)
+            pd.DataFrame({"number": [1]}).to_csv(os.path.join(tmp, "no_text.csv"), index=False)
+            files = find_input_files(tmp)
+
+            for workers in (1, 2):
+                combined, reports = analyze_files(files, workers=workers, backend="textblob")
+                self.assertEqual([report["file"] for report in reports], files)
+                self.assertIn("error", reports[0])
+                for report in reports[1:]:
+                    self.assertTrue(os.path.exists(report["output"]))
+                self.assertEqual(combined.total, len(expected))
+                self.assertEqual(combined.sentiment_counts, expected.sentiment_counts())
+                self.assertAlmostEqual(combined.mean_polarity, sum(r["polarity"] for r in expected) / len(expected))
+
+            # Results files are not picked up as inputs on the next run
+            self.assertEqual(find_input_files(os.path.join(tmp, "*.csv")), files)
+
+class TestColumnarFormats(unittest.TestCase):
+
+    reviews = ["I love it!", "Awful, broken on arrival.", None, "It is a box.", "Great value"] * 5
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = SentimentAnalyzer()
+        cls.expected = cls.analyzer.analyze_batch([text for text in cls.reviews if text is not None])
+
+    def write_inputs(self, tmp):
+        import pyarrow as pa
+
+        df = pd.DataFrame({"id": range(len(self.reviews)), "review": self.reviews})
+        paths = {"csv": os.path.join(tmp, "reviews.csv"), "parquet": os.path.join(tmp, "reviews.parquet"),
+                 "arrow": os.path.join(tmp, "reviews.arrow")}
+        df.to_csv(paths["csv"], index=False)
+        df.to_parquet(paths["parquet"], row_group_size=8)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_file(paths["arrow"], table.schema) as writer:
+            writer.write_table(table, max_chunksize=8)
+        return paths
+
+    def test_every_input_and_output_format(self):
+        """Test that Parquet and Arrow inputs and outputs give the same results as CSV"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, input_path in self.write_inputs(tmp).items():
+                self.assertEqual(read_columns(input_path), ["id", "review"])
+                for output_format in ("csv", "parquet", "arrow"):
+                    output_path = results_path(input_path, output_format, os.path.join(tmp, fmt))
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    stats = analyze_file_stream(self.analyzer, input_path, "review", output_path, chunk_size=7, workers=1)
+                    self.assertEqual(stats.total, len(self.expected))
+
+                    if output_format == "csv":
+                        written = pd.read_csv(output_path, keep_default_na=False)
+                    elif output_format == "parquet":
+                        written = pd.read_parquet(output_path)
+                    else:
+                        written = pa.ipc.open_file(output_path).read_all().to_pandas()
+                    self.assertEqual(written["sentiment"].tolist(), [r["sentiment"] for r in self.expected])
+                    self.assertEqual(written["polarity"].tolist(), [r["polarity"] for r in self.expected])
+
+            schema = pq.read_schema(os.path.join(tmp, "parquet", "reviews_sentiment_results.parquet"))
+            self.assertEqual(schema.field("polarity").type, pa.float64())
+            self.assertTrue(pa.types.is_dictionary(schema.field("sentiment").type))
+
+    def test_empty_columnar_output_has_schema(self):
+        """Test that a file without text still gets a readable results file"""
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "empty.parquet")
+            pd.DataFrame({"review": [None, None]}, dtype="object").to_parquet(input_path)
+            output_path = results_path(input_path)
+            stats = analyze_file_stream(self.analyzer, input_path, "review", output_path)
+            self.assertEqual(stats.total, 0)
+            self.assertEqual(pq.read_table(output_path).num_rows, 0)
+
+class TestStreamingCSV(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = SentimentAnalyzer()
+
+    def test_stream_matches_whole_file(self):
+        """Test that chunked streaming writes the same rows and totals as a full load"""
+        reviews = ["I love it!", "Awful, broken on arrival.", None, "It is a box.", "Great value"] * 5
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "reviews.csv")
+            output_path = os.path.join(tmp, "reviews_sentiment_results.csv")
+            pd.DataFrame({"id": range(len(reviews)), "review": reviews}).to_csv(input_path, index=False)
+
+            stats = analyze_csv_stream(self.analyzer, input_path, "review", output_path, chunk_size=7, workers=1)
+            streamed = pd.read_csv(output_path, keep_default_na=False)
+
+        expected = self.analyzer.analyze_batch([text for text in reviews if text is not None])
+
+        self.assertEqual(stats.total, len(expected))
+        self.assertEqual(len(streamed), len(expected))
+        self.assertEqual(streamed["sentiment"].tolist(), [r["sentiment"] for r in expected])
+        self.assertAlmostEqual(stats.mean_polarity, sum(r["polarity"] for r in expected) / len(expected))
+        self.assertEqual(sum(stats.sentiment_counts.values()), len(expected))
+        self.assertEqual(stats.counts_series().sum(), len(expected))
+        self.assertEqual(stats.polarity_histogram.total, len(expected))
+        self.assertEqual(stats.words.to_dict(),
+                         dict(Counter(" ".join(r["cleaned_text"] for r in expected).split())))
+
+    def test_stream_reuses_one_worker_pool(self):
+        """Test that every chunk of a parallel stream is scored by the same process pool"""
+        import concurrent.futures
+
+        created = []
+
+        class CountingPool(concurrent.futures.ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                super().__init__(*args, **kwargs)
+
+        # Each chunk holds more distinct texts than analyze_batch's chunk_size, so it goes parallel
+        reviews = [f"Review number {i} was great" for i in range(1200)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "reviews.csv")
+            output_path = os.path.join(tmp, "reviews_sentiment_results.csv")
+            pd.DataFrame({"review": reviews}).to_csv(input_path, index=False)
+
+            with patch.object(concurrent.futures, "ProcessPoolExecutor", CountingPool):
+                stats = analyze_file_stream(self.analyzer, input_path, "review", output_path,
+                                            chunk_size=600, workers=2)
+
+        self.assertEqual(stats.total, len(reviews))
+        self.assertEqual(len(created), 1)
+        self.assertIsNone(self.analyzer._pool)
+
+class TestIncrementalCSV(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = SentimentAnalyzer()
+
+    def run_incremental(self, tmp, reviews):
+        input_path = os.path.join(tmp, "reviews.csv")
+        output_path = os.path.join(tmp, "reviews_sentiment_results.csv")
+        pd.DataFrame({"review": reviews}).to_csv(input_path, index=False)
+        stats, scored = analyze_csv_incremental(self.analyzer, input_path, "review", output_path,
+                                                chunk_size=4, workers=1)
+        return stats, scored, pd.read_csv(output_path, keep_default_na=False)
+
+    def assert_matches_full_run(self, stats, written, reviews):
+        expected = self.analyzer.analyze_batch([text for text in reviews if text is not None])
+        self.assertEqual(written["text"].tolist(), [r["text"] for r in expected])
+        self.assertEqual(written["sentiment"].tolist(), [r["sentiment"] for r in expected])
+        self.assertEqual(stats.total, len(expected))
+        self.assertAlmostEqual(stats.mean_polarity, sum(r["polarity"] for r in expected) / len(expected))
+        self.assertEqual(stats.sentiment_counts, expected.sentiment_counts())
+        histogram = PolarityHistogram()
+        histogram.update(expected.polarity)
+        self.assertEqual(stats.polarity_histogram.counts.tolist(), histogram.counts.tolist())
+        self.assertEqual(stats.words.to_dict(),
+                         dict(Counter(" ".join(r["cleaned_text"] for r in expected).split())))
+
+    def test_only_new_and_changed_rows_are_scored(self):
+        """Test that re-runs score only appended or edited rows and still match a full run"""
+        reviews = ["I love it!", "Awful, broken on arrival.", None, "It is a box.", "Great value"] * 2
+
+        with tempfile.TemporaryDirectory() as tmp:
+            stats, scored, written = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 8)
+            self.assertTrue(os.path.exists(store_path_for(os.path.join(tmp, "reviews_sentiment_results.csv"))))
+            self.assert_matches_full_run(stats, written, reviews)
+
+            _, scored, _ = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 0)
+
+            # Appended rows only
+            reviews += ["Terrible support", "Works fine"]
+            stats, scored, written = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 2)
+            self.assert_matches_full_run(stats, written, reviews)
+
+            # An edited row, a row that became empty and a shorter file
+            reviews[0] = "I hate it!"
+            reviews[3] = None
+            reviews = reviews[:-1]
+            stats, scored, written = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 1)
+            self.assert_matches_full_run(stats, written, reviews)
+
+    def test_filled_empty_row_is_written(self):
+        """Test that a row empty last run and filled now is written along with appended rows"""
+        reviews = ["good", None, "bad", "fine"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.run_incremental(tmp, reviews)
+
+            reviews = ["good", "awful now filled", "bad", "fine", "new row"]
+            stats, scored, written = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 2)
+            self.assertEqual(len(written), 5)
+            self.assert_matches_full_run(stats, written, reviews)
+
+    def test_edited_results_file_is_rewritten(self):
+        """Test that a results file changed by hand is rebuilt from the store"""
+        reviews = ["I love it!", "Awful, broken on arrival.", "It is a box."]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.run_incremental(tmp, reviews)
+            with open(os.path.join(tmp, "reviews_sentiment_results.csv"), "w") as f:
+                f.write("garbage\n")
+
+            reviews.append("Great value")
+            stats, scored, written = self.run_incremental(tmp, reviews)
+            self.assertEqual(scored, 1)
+            self.assert_matches_full_run(stats, written, reviews)
+
 def run_tests():
     """Run all tests with detailed output"""
     print("Running Sentiment Analyzer Tests...")
     print("=" * 50)
     
     # Create test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestSentimentAnalyzer)
+    suite = unittest.TestLoader().loadTestsFromModule(sys.modules[__name__])
     
     # Run tests with detailed output
     runner = unittest.TextTestRunner(verbosity=2)
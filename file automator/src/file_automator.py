@@ -1,9 +1,20 @@
 import os
+import re
+import json
+import errno
+import argparse
+import tempfile
 import time
 import logging
 import shutil
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import LoggingEventHandler
+from rules import RuleEngine
+from metrics import Metrics
 
 # Configure logging
 logging.basicConfig(
@@ -12,10 +23,373 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
+class SettleQueue:
+    # Debounced work queue: paths are recorded as events arrive and handed to a worker
+    # pool once their size and mtime have stopped changing for settle_time seconds.
+    # Repeated events for a path coalesce into one pending entry.
+
+    def __init__(self, callback, settle_time=1.0, poll_interval=0.25, workers=4, metrics=None):
+        # callback(path) returns a true value when it organized the file; with metrics,
+        # the time from the first event to that is recorded as event_to_move_seconds
+        self.callback = callback
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.metrics = metrics
+        # path -> [last (size, mtime_ns) seen or None, monotonic time it last changed,
+        #          monotonic time of its first event]
+        self._pending = {}
+        self.in_progress = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        self._stopped.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="organizer")
+        self._thread = threading.Thread(target=self._run, name="settle-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        # Stops polling; paths already handed to the pool finish when wait is True
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def add(self, path):
+        # Record an event for path, restarting its settle window. Never blocks on I/O.
+        with self._lock:
+            entry = self._pending.get(path)
+            now = time.monotonic()
+            if entry is None:
+                self._pending[path] = [None, now, now]
+            else:
+                entry[1] = now
+
+    def touch(self, path):
+        # Like add, for events that only matter when the path is already pending
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is not None:
+                entry[1] = time.monotonic()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_interval):
+            for path, first_seen in self.poll():
+                with self._lock:
+                    self.in_progress += 1
+                self._executor.submit(self._call, path, first_seen)
+
+    def _call(self, path, first_seen):
+        try:
+            if self.callback(path) and self.metrics is not None:
+                self.metrics.observe("event_to_move_seconds", time.monotonic() - first_seen)
+        except Exception as e:
+            logging.error(f"Error processing {path}: {str(e)}")
+        finally:
+            with self._lock:
+                self.in_progress -= 1
+
+    def poll(self):
+        # Stat every pending path once and return (path, time of its first event) for the
+        # ones that have settled. Paths that disappeared are dropped.
+        with self._lock:
+            paths = list(self._pending)
+
+        now = time.monotonic()
+        ready = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                signature = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                signature = None
+
+            with self._lock:
+                entry = self._pending.get(path)
+                if entry is None:
+                    continue
+                if signature is None:
+                    del self._pending[path]
+                elif signature != entry[0]:
+                    entry[0] = signature
+                    entry[1] = now
+                elif now - entry[1] >= self.settle_time:
+                    del self._pending[path]
+                    ready.append((path, entry[2]))
+        return ready
+
+
+class ProcessedFiles:
+    # Bounded record of files already handled, keyed on (path, inode, mtime_ns) so a
+    # name that is reused by a new file is processed again. Entries are evicted oldest
+    # first once there are more than max_entries or they are older than ttl seconds.
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(path):
+        # Identity of the file currently at path, or None if it is gone
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (path, st.st_ino, st.st_mtime_ns)
+
+    def add(self, key):
+        # Record key and return True, or return False if it was already recorded
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if key in self._entries:
+                return False
+            self._entries[key] = now
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def _evict(self, now):
+        entries = self._entries
+        while entries:
+            key, added = next(iter(entries.items()))
+            if now - added < self.ttl:
+                break
+            del entries[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# "report (12).pdf" -> base "report", suffix 12
+SUFFIX_PATTERN = re.compile(r"^(.*) \((\d+)\)$")
+
+
+class DestinationIndex:
+    # Names used in one destination directory and the highest "name (N)" suffix per
+    # base name, so a free name is found without probing the filesystem. Built with a
+    # single os.scandir and updated as files are moved in.
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._names = set()
+        self._max_suffix = {}
+        self._lock = threading.Lock()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                self._record(entry.name)
+
+    def _record(self, filename):
+        # Caller holds the lock (or is the constructor)
+        self._names.add(os.path.normcase(filename))
+        base, ext = os.path.splitext(filename)
+        match = SUFFIX_PATTERN.match(base)
+        if match:
+            key = os.path.normcase(match.group(1) + ext)
+            suffix = int(match.group(2))
+            if suffix > self._max_suffix.get(key, 0):
+                self._max_suffix[key] = suffix
+
+    def reserve(self, filename):
+        # Return a path in the directory for filename that no earlier reservation or
+        # existing file uses, and mark it as used
+        with self._lock:
+            candidate = filename
+            if os.path.normcase(candidate) in self._names:
+                base, ext = os.path.splitext(filename)
+                counter = self._max_suffix.get(os.path.normcase(filename), 0) + 1
+                candidate = f"{base} ({counter}){ext}"
+                while os.path.normcase(candidate) in self._names:
+                    counter += 1
+                    candidate = f"{base} ({counter}){ext}"
+            self._record(candidate)
+            return os.path.join(self.directory, candidate)
+
+    def __contains__(self, filename):
+        with self._lock:
+            return os.path.normcase(filename) in self._names
+
+
+# Errors meaning a kernel copy primitive can't be used for this pair of files
+COPY_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
+COPY_CHUNK = 64 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+
+
+# renameat2() flag: fail with EEXIST instead of replacing the destination
+RENAME_NOREPLACE = 1
+AT_FDCWD = -100
+
+
+@functools.lru_cache(maxsize=None)
+def _load_renameat2():
+    # libc's renameat2, or None where there is none (not Linux, or glibc before 2.28)
+    try:
+        import ctypes
+        func = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    func.restype = ctypes.c_int
+    return func
+
+
+def rename_noreplace(src, dst):
+    # Rename src to dst on the same device, raising FileExistsError instead of replacing dst.
+    # Uses renameat2(RENAME_NOREPLACE) when the kernel and filesystem support it; otherwise
+    # a checked os.rename, which the destination index's reservation keeps from racing
+    # with this process's other moves.
+    renameat2 = _load_renameat2()
+    if renameat2 is not None:
+        import ctypes
+        if renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(err, os.strerror(err), src, None, dst)
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+    os.rename(src, dst)
+
+
+class MoveEngine:
+    # Moves files without ever overwriting the destination. A symlink is moved as the
+    # link itself, never as a copy of (or hard link to) its target.
+    # On the same device the move is a single atomic step: os.rename on Windows (which
+    # refuses to replace), a hard link plus unlink elsewhere (rename would replace), or
+    # a no-replace rename on filesystems without hard links (FAT/exFAT, SMB mounts,
+    # protected_hardlinks on someone else's file).
+    # Across devices the data is copied inside the kernel (copy_file_range, then
+    # sendfile, then a plain buffered copy), fsynced, and only then is the source removed.
+    # Copies run concurrently, but at most max_bytes_in_flight bytes at a time; a
+    # single file larger than that is copied on its own.
+
+    def __init__(self, max_bytes_in_flight=512 * 1024 * 1024):
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self._in_flight = 0
+        self._budget = threading.Condition()
+
+    def move(self, src, dst):
+        # Raises FileExistsError if dst exists
+        if os.name == "nt":
+            os.rename(src, dst)
+            return
+        try:
+            os.link(src, dst, follow_symlinks=False)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.EMLINK):
+                raise
+            if e.errno != errno.EXDEV and self._same_device(src, dst):
+                # No hard links here, but a rename is still one step with no data copied
+                rename_noreplace(src, dst)
+                return
+            self._copy_across(src, dst)
+        os.unlink(src)
+
+    @staticmethod
+    def _same_device(src, dst):
+        return os.lstat(src).st_dev == os.stat(os.path.dirname(dst)).st_dev
+
+    def _acquire(self, size):
+        with self._budget:
+            while self._in_flight and self._in_flight + size > self.max_bytes_in_flight:
+                self._budget.wait()
+            self._in_flight += size
+
+    def _release(self, size):
+        with self._budget:
+            self._in_flight -= size
+            self._budget.notify_all()
+
+    def _copy_across(self, src, dst):
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            return
+        fsrc = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            st = os.fstat(fsrc)
+            fdst = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                           st.st_mode & 0o777)
+            try:
+                self._acquire(st.st_size)
+                try:
+                    self._copy_data(fsrc, fdst, st.st_size)
+                finally:
+                    self._release(st.st_size)
+                os.fsync(fdst)
+            except BaseException:
+                os.close(fdst)
+                os.unlink(dst)
+                raise
+            os.close(fdst)
+        finally:
+            os.close(fsrc)
+        shutil.copystat(src, dst)
+
+    def _copy_data(self, fsrc, fdst, size):
+        offset = 0
+        if hasattr(os, "copy_file_range"):
+            try:
+                while offset < size:
+                    copied = os.copy_file_range(fsrc, fdst, min(size - offset, COPY_CHUNK), offset, offset)
+                    if not copied:
+                        break
+                    offset += copied
+                if offset >= size:
+                    return
+            except OSError as e:
+                if e.errno not in COPY_UNSUPPORTED:
+                    raise
+
+        if hasattr(os, "sendfile") and os.name != "nt":
+            try:
+                os.lseek(fdst, offset, os.SEEK_SET)
+                while offset < size:
+                    copied = os.sendfile(fdst, fsrc, offset, min(size - offset, COPY_CHUNK))
+                    if not copied:
+                        break
+                    offset += copied
+                if offset >= size:
+                    return
+            except OSError as e:
+                if e.errno not in COPY_UNSUPPORTED:
+                    raise
+
+        # Whatever is left (or the file grew): buffered copy
+        os.lseek(fsrc, offset, os.SEEK_SET)
+        os.lseek(fdst, offset, os.SEEK_SET)
+        while True:
+            data = os.read(fsrc, BUFFER_SIZE)
+            if not data:
+                break
+            while data:
+                written = os.write(fdst, data)
+                data = data[written:]
+
+
 class FileOrganizerHandler(LoggingEventHandler):
     # Custom event handler for file organization.
 
-    # Expanded file categories and their extensions
+    # Expanded file categories and their extensions, used after any configured rules
     FILE_CATEGORIES = {
         "Documents": 
         [".pdf", ".doc", ".docx", ".txt", ".xlsx", ".xls", ".csv", 
@@ -29,76 +403,270 @@ class FileOrganizerHandler(LoggingEventHandler):
         "Others": []
     }
 
-    def __init__(self, source_dir):
+    def __init__(self, source_dir, settle_time=1.0, workers=4, recursive=False, rules_path=None, dry_run=False):
         super().__init__()
         self.source_dir = source_dir
-        self.extension_map = self._create_extension_map()
-        self.processed_files = set()
+        # In a dry run files are classified and counted but never moved
+        self.dry_run = dry_run
+        # In recursive mode files in subfolders are organized too (the category folders excepted)
+        self.recursive = recursive
+        # Rules from rules_path (hot-reloaded when it changes), then FILE_CATEGORIES
+        self.rules = RuleEngine(rules_path, builtin=self.FILE_CATEGORIES)
+        self.processed_files = ProcessedFiles()
+        self._dest_indexes = {}
+        self._dest_lock = threading.Lock()
+        self.mover = MoveEngine()
+        # Files are organized by the queue's workers once they stop changing,
+        # so the observer thread never waits on a transfer
+        self.metrics = Metrics()
+        self.queue = SettleQueue(self._process_file, settle_time=settle_time, workers=workers, metrics=self.metrics)
+        self.metrics.gauge("queue_depth", lambda: len(self.queue))
+        self.metrics.gauge("in_progress", lambda: self.queue.in_progress)
+        self.metrics.gauge("processed_tracked", lambda: len(self.processed_files))
+
+    def start(self):
+        self.queue.start()
 
-    def _create_extension_map(self):
-        # Create reverse mapping from extensions to categories.
-        mapping = {}
-        for category, exts in self.FILE_CATEGORIES.items():
-            for ext in exts:
-                mapping[ext.lower()] = category
-        return mapping
+    def stop(self):
+        self.queue.stop()
 
     def on_created(self, event):
-        # Handle file creation event with safety checks.
-        if event.is_directory:
+        # Queue new files; they are organized once their transfer has finished.
+        if event.is_directory or not self._is_watched(event.src_path):
             return
+        self.metrics.increment("events")
+        self.queue.add(event.src_path)
 
-        file_path = event.src_path
-        time.sleep(5)  # Allow time for file transfers to complete
+    def on_moved(self, event):
+        # Files moved or renamed into the folder are organized like new ones.
+        if event.is_directory or not self._is_watched(event.dest_path):
+            return
+        self.metrics.increment("events")
+        self.queue.add(event.dest_path)
 
-        if file_path not in self.processed_files:
-            self.processed_files.add(file_path)
-            self._organize_file(file_path)
+    def on_modified(self, event):
+        # A file still being written keeps its settle window open.
+        if not event.is_directory:
+            self.queue.touch(event.src_path)
 
-    def _get_unique_path(self, destination, filename):
-        # Handle duplicate filenames by adding suffixes.
-        base, ext = os.path.splitext(filename)
-        counter = 1
-        new_name = filename
+    def _is_category_dir(self, path):
+        return os.path.dirname(path) == self.source_dir and os.path.basename(path) in self.rules.categories
+
+    def _is_watched(self, path):
+        # Whether a file at path is one to organize: directly in the source folder, or in
+        # recursive mode anywhere below it except in the category folders.
+        parent = os.path.dirname(path)
+        if parent == self.source_dir:
+            return True
+        if not self.recursive:
+            return False
+        relative = os.path.relpath(path, self.source_dir)
+        top = relative.split(os.sep, 1)[0]
+        return top != os.pardir and top not in self.rules.categories
+
+    def _scan_backlog(self):
+        # Yield a DirEntry for every file waiting to be organized, walking with os.scandir.
+        stack = [self.source_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive and not self._is_category_dir(entry.path):
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+            except OSError as e:
+                logging.error(f"Error scanning {directory}: {str(e)}")
 
-        while os.path.exists(os.path.join(destination, new_name)):
-            new_name = f"{base} ({counter}){ext}"
-            counter += 1
+    def _process_batch(self, file_paths):
+        return sum(1 for file_path in file_paths if self._process_file(file_path))
 
-        return os.path.join(destination, new_name)
+    def sweep(self, batch_size=256):
+        # Organize the files already in the folder at startup: the ones left while the
+        # daemon was down. Files modified within the settle window may still be
+        # transferring, so they go through the queue instead.
+        cutoff = time.time() - self.queue.settle_time
+        futures = []
+        batch = []
+        queued = 0
+
+        with ThreadPoolExecutor(max_workers=self.queue.workers, thread_name_prefix="sweep") as executor:
+            for entry in self._scan_backlog():
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if mtime > cutoff:
+                    self.queue.add(entry.path)
+                    queued += 1
+                    continue
+
+                batch.append(entry.path)
+                if len(batch) >= batch_size:
+                    futures.append(executor.submit(self._process_batch, batch))
+                    batch = []
+            if batch:
+                futures.append(executor.submit(self._process_batch, batch))
+
+        organized = sum(future.result() for future in futures)
+        logging.info(f"Startup sweep organized {organized} files, {queued} still settling")
+        return organized
+
+    def _process_file(self, file_path):
+        # Called by the queue's workers for a file that has settled.
+        # Returns the path the file was moved to, or None.
+        key = self.processed_files.key_for(file_path)
+        if key is None:
+            return None
+        if not self.processed_files.add(key):
+            self.metrics.increment("duplicates_skipped")
+            return None
+        return self._organize_file(file_path)
+
+    def _destination_index(self, destination):
+        # Name index of a category directory, created with it on first use.
+        with self._dest_lock:
+            index = self._dest_indexes.get(destination)
+            if index is None:
+                os.makedirs(destination, exist_ok=True)
+                index = self._dest_indexes[destination] = DestinationIndex(destination)
+            return index
+
+    def _get_unique_path(self, destination, filename):
+        # Handle duplicate filenames by adding suffixes ("name (1).ext", "name (2).ext", ...).
+        # The returned name is reserved, so concurrent moves never pick the same one.
+        return self._destination_index(destination).reserve(filename)
+
+    def _move_unique(self, file_path, destination, filename):
+        # Move under a unique name; if another process took the name first, reserve the next one.
+        while True:
+            dest_path = self._get_unique_path(destination, filename)
+            try:
+                self.mover.move(file_path, dest_path)
+                return dest_path
+            except FileExistsError:
+                continue
 
     def _organize_file(self, file_path):
         # Organize file into appropriate category directory.
+        # Returns the path the file was moved to, or None.
         try:
             if not os.path.isfile(file_path):
-                return
+                return None
 
             filename = os.path.basename(file_path)
-            _, ext = os.path.splitext(filename)
-            category = self.extension_map.get(ext.lower(), "Others")
-
+            category = self.rules.classify(file_path)
             dest_dir = os.path.join(self.source_dir, category)
-            os.makedirs(dest_dir, exist_ok=True)
 
-            dest_path = self._get_unique_path(dest_dir, filename)
-            shutil.move(file_path, dest_path)
+            if self.dry_run:
+                self.metrics.increment("classified")
+                logging.info(f"File '{filename}' would be moved to {category}")
+                return os.path.join(dest_dir, filename)
+
+            start = time.monotonic()
+            dest_path = self._move_unique(file_path, dest_dir, filename)
+            self.metrics.observe("move_seconds", time.monotonic() - start)
+            self.metrics.increment("moved")
 
             logging.info(f"File '{filename}' moved to {category}")
+            return dest_path
 
         except Exception as e:
+            self.metrics.increment("errors")
             logging.error(f"Error processing {file_path}: {str(e)}")
+            return None
+
+
+def run_benchmark(count, dry_run=False, workers=4, settle_time=0.25, file_size=1024, timeout=600):
+    # Create count files in a temporary watched folder and measure how fast they are organized,
+    # from the first file written to the last one moved (or classified, in a dry run).
+    # Returns the handler's metrics snapshot with a "benchmark" summary added.
+    extensions = [ext for exts in FileOrganizerHandler.FILE_CATEGORIES.values() for ext in exts] + [".xyz", ""]
+    payload = os.urandom(file_size)
+    done_counter = "classified" if dry_run else "moved"
+
+    with tempfile.TemporaryDirectory() as source_directory:
+        event_handler = FileOrganizerHandler(source_directory, settle_time=settle_time, workers=workers,
+                                             dry_run=dry_run)
+        observer = Observer()
+        observer.schedule(event_handler, source_directory, recursive=False)
+        event_handler.start()
+        observer.start()
+        try:
+            start = time.monotonic()
+            for i in range(count):
+                with open(os.path.join(source_directory, f"bench_{i}{extensions[i % len(extensions)]}"), "wb") as f:
+                    f.write(payload)
+            created = time.monotonic() - start
+
+            counters = event_handler.metrics.counters
+            while counters.get(done_counter, 0) + counters.get("errors", 0) < count:
+                if time.monotonic() - start > timeout:
+                    logging.error(f"Benchmark timed out after {timeout}s")
+                    break
+                time.sleep(0.01)
+            elapsed = time.monotonic() - start
+        finally:
+            observer.stop()
+            observer.join()
+            event_handler.stop()
+
+    report = event_handler.metrics.snapshot()
+    report["benchmark"] = {
+        "files": count,
+        "dry_run": dry_run,
+        "workers": workers,
+        "settle_time": settle_time,
+        "file_size": file_size,
+        "create_seconds": created,
+        "seconds": elapsed,
+        "files_per_second": count / elapsed if elapsed > 0 else None,
+    }
+    return report
 
 
 def main():
-    source_directory = "C:/Users/yourpath/Downloads"
+    parser = argparse.ArgumentParser(description="Sort files into category folders as they arrive")
+    parser.add_argument("source", nargs="?", default="C:/Users/yourpath/Downloads", help="folder to organize")
+    parser.add_argument("--recursive", action="store_true", help="also organize files in subfolders")
+    parser.add_argument("--rules", default=None, help="JSON rules file, reloaded when it changes")
+    parser.add_argument("--workers", type=int, default=4, help="files moved at once")
+    parser.add_argument("--settle-time", type=float, default=None,
+                        help="seconds a file's size and mtime must stay unchanged before it is moved "
+                             "(default: 1, or 0.25 with --benchmark)")
+    parser.add_argument("--dry-run", action="store_true", help="classify and log files without moving them")
+    parser.add_argument("--metrics", default=None, help="write a JSON metrics snapshot to this file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between metrics snapshots")
+    parser.add_argument("--benchmark", type=int, default=None, metavar="N",
+                        help="organize N synthetic files in a temporary folder, print the metrics and exit")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        # Per-file log lines would dominate the measurement
+        logging.getLogger().setLevel(logging.WARNING)
+        report = run_benchmark(args.benchmark, dry_run=args.dry_run, workers=args.workers,
+                               settle_time=0.25 if args.settle_time is None else args.settle_time)
+        print(json.dumps(report, indent=2))
+        return
+
+    source_directory = os.path.normpath(args.source)
 
-    event_handler = FileOrganizerHandler(source_directory)
+    settle_time = 1.0 if args.settle_time is None else args.settle_time
+    event_handler = FileOrganizerHandler(source_directory, settle_time=settle_time, workers=args.workers,
+                                         recursive=args.recursive, rules_path=args.rules, dry_run=args.dry_run)
+    if args.metrics:
+        event_handler.metrics.start_dump(args.metrics, args.metrics_interval)
     observer = Observer()
-    observer.schedule(event_handler, source_directory, recursive=False)
+    observer.schedule(event_handler, source_directory, recursive=args.recursive)
 
     try:
+        event_handler.start()
         observer.start()
         logging.info(f"Monitoring started in {source_directory}")
+        # Events are already being recorded, so nothing arriving during the sweep is missed
+        event_handler.sweep()
         while True:
             time.sleep(5)
     except KeyboardInterrupt:
@@ -106,6 +674,9 @@ def main():
         logging.info("Monitoring terminated by user")
     finally:
         observer.join()
+        event_handler.stop()
+        if args.metrics:
+            event_handler.metrics.stop_dump(args.metrics)
 
 
 if __name__ == "__main__":
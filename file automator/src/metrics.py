@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    # Counts of observed values per bucket, plus their count, sum and maximum
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th quantile (max for the overflow bucket)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.bounds + ("+Inf",), self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    # Counters, gauges and latency histograms of the organizer, safe to update from any
+    # thread. snapshot() returns them as a JSON-ready dict with rates since startup and
+    # since the previous snapshot; start_dump() writes one to a file periodically.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        # name -> callable returning the current value, read at snapshot time
+        self.gauges = {}
+        self.started = time.monotonic()
+        self._last = (self.started, {})
+        self._dump_thread = None
+        self._stopped = threading.Event()
+
+    def increment(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name, func):
+        self.gauges[name] = func
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: h.snapshot() for name, h in self.histograms.items()}
+            last_time, last_counters = self._last
+            self._last = (now, counters)
+
+        uptime = now - self.started
+        interval = now - last_time
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": uptime,
+            "counters": counters,
+            "rates_per_second": {name: n / uptime if uptime > 0 else 0.0 for name, n in counters.items()},
+            "recent_rates_per_second": {
+                name: (n - last_counters.get(name, 0)) / interval if interval > 0 else 0.0
+                for name, n in counters.items()
+            },
+            "gauges": {name: func() for name, func in self.gauges.items()},
+            "histograms": histograms,
+        }
+
+    def dump(self, path):
+        # Writes snapshot() to path as JSON, replacing it atomically so readers never see half a file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_dump(self, path, interval=10.0):
+        self._stopped.clear()
+
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    logging.error(f"Error writing metrics to {path}: {str(e)}")
+
+        self._dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self, path=None):
+        # Stops the periodic dump, writing one last snapshot to path if given
+        self._stopped.set()
+        if self._dump_thread is not None:
+            self._dump_thread.join()
+            self._dump_thread = None
+        if path:
+            self.dump(path)
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import time
+import fnmatch
+import logging
+import threading
+
+# Categorization rules for the file organizer, loaded from a JSON file:
+#
+# {
+#     "rules": [
+#         {"category": "Installers", "extensions": [".exe", ".msi"]},
+#         {"category": "Screenshots", "glob": "Screenshot*.png"},
+#         {"category": "Large Videos", "extensions": [".mp4", ".mkv"], "min_size": 1073741824},
+#         {"category": "Old Archives", "glob": "*.zip", "min_age_days": 30},
+#         {"category": "Documents", "extensions": [""], "magic": "%PDF"}
+#     ],
+#     "default": "Others",
+#     "include_builtin": true
+# }
+#
+# A rule matches when all of its conditions do; the first matching rule wins, and the
+# built-in extension categories are tried after the configured rules.
+#   extensions: any of these (lowercase, with the dot; "" means no extension)
+#   glob: shell pattern for the file name, case-insensitive
+#   min_size / max_size: bytes
+#   min_age_days / max_age_days: days since the last modification
+#   magic: header the file starts with (or a list of them), text or "hex:89504e47";
+#          magic_offset moves where it is looked for
+
+# Never read more than this much of a file to sniff its content
+MAX_HEADER_BYTES = 64
+
+
+def _parse_magic(value):
+    if value.startswith("hex:"):
+        return bytes.fromhex(value[4:])
+    return value.encode("latin-1")
+
+
+class Rule:
+    # One compiled rule; its checks run cheapest first
+
+    def __init__(self, order, spec):
+        self.order = order
+        self.category = spec["category"]
+        self.extensions = [ext.lower() for ext in spec.get("extensions", [])]
+        glob = spec.get("glob")
+        self.pattern = re.compile(fnmatch.translate(glob.lower())) if glob else None
+        self.min_size = spec.get("min_size")
+        self.max_size = spec.get("max_size")
+        self.min_age = spec["min_age_days"] * 86400 if "min_age_days" in spec else None
+        self.max_age = spec["max_age_days"] * 86400 if "max_age_days" in spec else None
+
+        magic = spec.get("magic", [])
+        self.magic = [_parse_magic(m) for m in ([magic] if isinstance(magic, str) else magic)]
+        self.magic_offset = spec.get("magic_offset", 0)
+        if self.magic and self.magic_offset + max(map(len, self.magic)) > MAX_HEADER_BYTES:
+            raise ValueError(f"magic for '{self.category}' reaches past the first {MAX_HEADER_BYTES} bytes")
+
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size, self.min_age, self.max_age))
+
+    def matches(self, name, facts):
+        if self.pattern is not None and not self.pattern.match(name):
+            return False
+        if self.needs_stat:
+            st = facts.stat()
+            if self.min_size is not None and st.st_size < self.min_size:
+                return False
+            if self.max_size is not None and st.st_size > self.max_size:
+                return False
+            age = time.time() - st.st_mtime
+            if self.min_age is not None and age < self.min_age:
+                return False
+            if self.max_age is not None and age > self.max_age:
+                return False
+        if self.magic:
+            header = facts.header()[self.magic_offset:]
+            if not any(header.startswith(m) for m in self.magic):
+                return False
+        return True
+
+
+class _FileFacts:
+    # Stat result and header of a file, each read at most once and only if a rule asks
+
+    def __init__(self, path):
+        self.path = path
+        self._stat = None
+        self._header = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def header(self):
+        if self._header is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._header = f.read(MAX_HEADER_BYTES)
+            except OSError:
+                self._header = b""
+        return self._header
+
+
+class RuleSet:
+    # Rules compiled into a lookup: the candidates for a file are found with one dict
+    # lookup on its extension, already merged with the extension-less rules and in order.
+    # A file whose candidates are plain extension rules is classified without any I/O.
+
+    def __init__(self, specs, default="Others"):
+        self.default = default
+        self.rules = [Rule(order, spec) for order, spec in enumerate(specs)]
+        self.categories = {rule.category for rule in self.rules} | {default}
+
+        generic = [rule for rule in self.rules if not rule.extensions]
+        by_extension = {}
+        for rule in self.rules:
+            for ext in rule.extensions:
+                by_extension.setdefault(ext, []).append(rule)
+        self._candidates = {
+            ext: sorted(set(rules) | set(generic), key=lambda rule: rule.order)
+            for ext, rules in by_extension.items()
+        }
+        self._generic = generic
+
+    @classmethod
+    def from_config(cls, config, builtin=None):
+        # builtin: {category: [extensions]}, tried after the configured rules
+        specs = list(config.get("rules", []))
+        if builtin and config.get("include_builtin", True):
+            specs += [{"category": category, "extensions": exts} for category, exts in builtin.items() if exts]
+        return cls(specs, config.get("default", "Others"))
+
+    def classify(self, path):
+        name = os.path.basename(path).lower()
+        candidates = self._candidates.get(os.path.splitext(name)[1], self._generic)
+        facts = _FileFacts(path)
+        for rule in candidates:
+            try:
+                if rule.matches(name, facts):
+                    return rule.category
+            except OSError:
+                # The file went away or can't be read; only rules not needing it can match
+                continue
+        return self.default
+
+
+class RuleEngine:
+    # RuleSet loaded from a JSON file and reloaded when the file changes, checked at most
+    # once per reload_interval seconds. Without a file the built-in categories are used.
+    # A broken file is logged and the previous rules stay in effect.
+
+    def __init__(self, config_path=None, builtin=None, reload_interval=1.0):
+        self.config_path = config_path
+        self.builtin = builtin
+        self.reload_interval = reload_interval
+        self.rules = RuleSet.from_config({}, builtin)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked = 0.0
+        if config_path:
+            self.reload()
+
+    @property
+    def categories(self):
+        return self.rules.categories
+
+    def reload(self):
+        # Load the config if it changed; returns True when new rules are in effect
+        try:
+            st = os.stat(self.config_path)
+        except OSError as e:
+            logging.error(f"Error reading rules from {self.config_path}: {str(e)}")
+            return False
+        signature = (st.st_size, st.st_mtime_ns)
+        if signature == self._signature:
+            return False
+
+        try:
+            with open(self.config_path, encoding="utf-8") as f:
+                rules = RuleSet.from_config(json.load(f), self.builtin)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.error(f"Error loading rules from {self.config_path}, keeping the previous rules: {str(e)}")
+            self._signature = signature
+            return False
+
+        self.rules = rules
+        self._signature = signature
+        logging.info(f"Loaded {len(rules.rules)} rules from {self.config_path}")
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.reload_interval:
+                return
+            self._checked = now
+            self.reload()
+
+    def classify(self, path):
+        if self.config_path:
+            self._maybe_reload()
+        return self.rules.classify(path)
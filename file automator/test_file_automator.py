@@ -0,0 +1,429 @@
+import os
+import sys
+import json
+import time
+import errno
+import tempfile
+import unittest
+from unittest import mock
+
+# The organizer modules import each other as top-level modules (they are run from src/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import file_automator
+from file_automator import SettleQueue, ProcessedFiles, DestinationIndex, MoveEngine, FileOrganizerHandler
+from rules import RuleSet, RuleEngine
+from metrics import Metrics
+
+
+def write_file(path, data=b"data", age=None):
+    # Create path (and its folders) holding data, last modified age seconds ago if given
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if age is not None:
+        past = time.time() - age
+        os.utime(path, (past, past))
+    return path
+
+
+class TempDirTestCase(unittest.TestCase):
+    # Gives each test an empty temporary folder in self.tmp
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+
+class TestSettleQueue(TempDirTestCase):
+
+    def test_events_coalesce(self):
+        queue = SettleQueue(lambda path: None)
+        path = os.path.join(self.tmp, "a.txt")
+        for _ in range(5):
+            queue.add(path)
+        self.assertEqual(len(queue), 1)
+
+    def test_touch_only_extends_pending_paths(self):
+        queue = SettleQueue(lambda path: None)
+        queue.touch(os.path.join(self.tmp, "a.txt"))
+        self.assertEqual(len(queue), 0)
+
+    def test_ready_once_size_and_mtime_settle(self):
+        queue = SettleQueue(lambda path: None, settle_time=0.2)
+        path = write_file(os.path.join(self.tmp, "a.txt"))
+        queue.add(path)
+
+        # The first poll only records the file's size and mtime
+        self.assertEqual(queue.poll(), [])
+        time.sleep(0.25)
+        with open(path, "ab") as f:
+            f.write(b"more")
+        # Still growing: the settle window starts over
+        self.assertEqual(queue.poll(), [])
+        self.assertEqual(queue.poll(), [])
+
+        time.sleep(0.25)
+        ready = queue.poll()
+        self.assertEqual([p for p, _ in ready], [path])
+        self.assertEqual(len(queue), 0)
+
+    def test_vanished_paths_are_dropped(self):
+        queue = SettleQueue(lambda path: None, settle_time=0)
+        path = write_file(os.path.join(self.tmp, "a.txt"))
+        queue.add(path)
+        queue.add(os.path.join(self.tmp, "gone.txt"))
+
+        queue.poll()
+        self.assertEqual(len(queue), 1)
+        os.remove(path)
+        self.assertEqual(queue.poll(), [])
+        self.assertEqual(len(queue), 0)
+
+    def test_workers_call_back_settled_paths(self):
+        called = []
+        metrics = Metrics()
+        queue = SettleQueue(lambda path: called.append(path) or path, settle_time=0.05, poll_interval=0.01,
+                            workers=2, metrics=metrics)
+        path = write_file(os.path.join(self.tmp, "a.txt"))
+        queue.start()
+        try:
+            queue.add(path)
+            deadline = time.monotonic() + 5
+            while not called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            queue.stop()
+        self.assertEqual(called, [path])
+        self.assertEqual(metrics.histograms["event_to_move_seconds"].count, 1)
+
+
+class TestProcessedFiles(TempDirTestCase):
+
+    def test_reused_name_is_a_new_file(self):
+        processed = ProcessedFiles()
+        path = write_file(os.path.join(self.tmp, "a.txt"))
+        self.assertTrue(processed.add(processed.key_for(path)))
+        self.assertFalse(processed.add(processed.key_for(path)))
+
+        # A new file under the same name (the inode may be reused, the mtime differs)
+        os.remove(path)
+        write_file(path, b"other", age=60)
+        self.assertTrue(processed.add(processed.key_for(path)))
+
+    def test_missing_file_has_no_key(self):
+        self.assertIsNone(ProcessedFiles.key_for(os.path.join(self.tmp, "gone.txt")))
+
+    def test_entries_expire_after_ttl(self):
+        processed = ProcessedFiles(ttl=0.05)
+        self.assertTrue(processed.add(("a", 1, 1)))
+        time.sleep(0.1)
+        self.assertTrue(processed.add(("b", 2, 2)))
+        self.assertNotIn(("a", 1, 1), processed)
+        self.assertEqual(len(processed), 1)
+
+    def test_oldest_entries_evicted_past_max(self):
+        processed = ProcessedFiles(max_entries=2)
+        for key in [("a", 1, 1), ("b", 2, 2), ("c", 3, 3)]:
+            processed.add(key)
+        self.assertEqual(len(processed), 2)
+        self.assertNotIn(("a", 1, 1), processed)
+        self.assertIn(("c", 3, 3), processed)
+
+
+class TestDestinationIndex(TempDirTestCase):
+
+    def test_reserve_numbers_past_the_highest_suffix(self):
+        write_file(os.path.join(self.tmp, "report.pdf"))
+        write_file(os.path.join(self.tmp, "report (3).pdf"))
+        index = DestinationIndex(self.tmp)
+
+        self.assertEqual(index.reserve("report.pdf"), os.path.join(self.tmp, "report (4).pdf"))
+        self.assertEqual(index.reserve("report.pdf"), os.path.join(self.tmp, "report (5).pdf"))
+        self.assertEqual(index.reserve("new.txt"), os.path.join(self.tmp, "new.txt"))
+        self.assertEqual(index.reserve("new.txt"), os.path.join(self.tmp, "new (1).txt"))
+        self.assertIn("new (1).txt", index)
+
+    def test_move_retries_when_name_taken_behind_its_back(self):
+        handler = FileOrganizerHandler(self.tmp)
+        destination = os.path.join(self.tmp, "Documents")
+        handler._destination_index(destination)
+        # Another process creates the name after the index was built
+        write_file(os.path.join(destination, "a.txt"), b"theirs")
+        src = write_file(os.path.join(self.tmp, "a.txt"), b"ours")
+
+        dest_path = handler._move_unique(src, destination, "a.txt")
+
+        self.assertEqual(dest_path, os.path.join(destination, "a (1).txt"))
+        with open(dest_path, "rb") as f:
+            self.assertEqual(f.read(), b"ours")
+        with open(os.path.join(destination, "a.txt"), "rb") as f:
+            self.assertEqual(f.read(), b"theirs")
+        self.assertFalse(os.path.exists(src))
+
+
+class TestSweep(TempDirTestCase):
+
+    def make_backlog(self):
+        write_file(os.path.join(self.tmp, "a.txt"), age=60)
+        write_file(os.path.join(self.tmp, "sub", "b.pdf"), age=60)
+        write_file(os.path.join(self.tmp, "sub", "deeper", "c.png"), age=60)
+        write_file(os.path.join(self.tmp, "Documents", "already.pdf"), age=60)
+
+    def test_recursive_sweep_skips_category_folders(self):
+        self.make_backlog()
+        handler = FileOrganizerHandler(self.tmp, recursive=True)
+
+        self.assertEqual(handler.sweep(), 3)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "Documents"))), ["a.txt", "already.pdf", "b.pdf"])
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "Images")), ["c.png"])
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "sub", "deeper")), [])
+
+    def test_flat_sweep_leaves_subfolders(self):
+        self.make_backlog()
+        handler = FileOrganizerHandler(self.tmp)
+
+        self.assertEqual(handler.sweep(), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "sub", "b.pdf")))
+
+    def test_recent_files_go_through_the_queue(self):
+        write_file(os.path.join(self.tmp, "fresh.txt"))
+        handler = FileOrganizerHandler(self.tmp, settle_time=60)
+
+        self.assertEqual(handler.sweep(), 0)
+        self.assertEqual(len(handler.queue), 1)
+
+
+class TestMoveEngine(TempDirTestCase):
+
+    def test_never_overwrites(self):
+        src = write_file(os.path.join(self.tmp, "src.txt"), b"new")
+        dst = write_file(os.path.join(self.tmp, "dst.txt"), b"old")
+
+        with self.assertRaises(FileExistsError):
+            MoveEngine().move(src, dst)
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertTrue(os.path.exists(src))
+
+    def test_cross_device_move_copies(self):
+        src = write_file(os.path.join(self.tmp, "src.bin"), os.urandom(100000), age=60)
+        mtime = os.stat(src).st_mtime
+        dst = os.path.join(self.tmp, "dst.bin")
+        with open(src, "rb") as f:
+            data = f.read()
+
+        engine = MoveEngine()
+        with mock.patch.object(os, "link", side_effect=OSError(errno.EXDEV, "cross-device link")), \
+                mock.patch.object(engine, "_copy_across", wraps=engine._copy_across) as copy_across:
+            engine.move(src, dst)
+
+        copy_across.assert_called_once_with(src, dst)
+        self.assertFalse(os.path.exists(src))
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertAlmostEqual(os.stat(dst).st_mtime, mtime, places=3)
+        self.assertEqual(engine._in_flight, 0)
+
+    def test_cross_device_move_never_overwrites(self):
+        src = write_file(os.path.join(self.tmp, "src.txt"), b"new")
+        dst = write_file(os.path.join(self.tmp, "dst.txt"), b"old")
+
+        with mock.patch.object(os, "link", side_effect=OSError(errno.EXDEV, "cross-device link")):
+            with self.assertRaises(FileExistsError):
+                MoveEngine().move(src, dst)
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertTrue(os.path.exists(src))
+
+    def test_buffered_copy_when_kernel_copy_unsupported(self):
+        src = write_file(os.path.join(self.tmp, "src.bin"), os.urandom(3 * 1024 * 1024 + 5))
+        dst = os.path.join(self.tmp, "dst.bin")
+        unsupported = OSError(errno.EXDEV, "unsupported")
+
+        with mock.patch.object(os, "copy_file_range", side_effect=unsupported, create=True), \
+                mock.patch.object(os, "sendfile", side_effect=unsupported, create=True):
+            MoveEngine()._copy_across(src, dst)
+
+        with open(src, "rb") as a, open(dst, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_same_device_without_hard_links_renames(self):
+        src = write_file(os.path.join(self.tmp, "src.txt"), b"new")
+        dst = os.path.join(self.tmp, "dst.txt")
+        taken = write_file(os.path.join(self.tmp, "taken.txt"), b"old")
+
+        engine = MoveEngine()
+        for renameat2 in [file_automator._load_renameat2(), None]:
+            with self.subTest(renameat2=renameat2 is not None), \
+                    mock.patch.object(os, "link", side_effect=OSError(errno.EPERM, "not permitted")), \
+                    mock.patch.object(file_automator, "_load_renameat2", return_value=renameat2), \
+                    mock.patch.object(engine, "_copy_across") as copy_across:
+                engine.move(src, dst)
+                with self.assertRaises(FileExistsError):
+                    engine.move(dst, taken)
+                engine.move(dst, src)
+
+                copy_across.assert_not_called()
+                with open(src, "rb") as f:
+                    self.assertEqual(f.read(), b"new")
+                with open(taken, "rb") as f:
+                    self.assertEqual(f.read(), b"old")
+
+    def test_symlink_moves_as_link(self):
+        target = write_file(os.path.join(self.tmp, "target.txt"))
+        for error in [None, OSError(errno.EXDEV, "cross-device link")]:
+            with self.subTest(error=error):
+                src = os.path.join(self.tmp, "link.txt")
+                dst = os.path.join(self.tmp, "moved.txt")
+                os.symlink(target, src)
+                with mock.patch.object(os, "link", side_effect=error, wraps=os.link):
+                    MoveEngine().move(src, dst)
+
+                self.assertTrue(os.path.islink(dst))
+                self.assertEqual(os.readlink(dst), target)
+                self.assertFalse(os.path.lexists(src))
+                self.assertEqual(os.stat(target).st_nlink, 1)
+                os.unlink(dst)
+
+
+class TestRules(TempDirTestCase):
+
+    def test_first_matching_rule_wins_before_builtin(self):
+        rules = RuleSet.from_config({"rules": [
+            {"category": "Screenshots", "glob": "screenshot*.png"},
+            {"category": "Pictures", "extensions": [".png"]},
+        ]}, builtin=FileOrganizerHandler.FILE_CATEGORIES)
+
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "Screenshot 2024.PNG")), "Screenshots")
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "cat.png")), "Pictures")
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "cat.gif")), "Images")
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "cat.xyz")), "Others")
+
+    def test_builtin_can_be_left_out(self):
+        rules = RuleSet.from_config({"include_builtin": False, "default": "Unsorted"},
+                                    builtin=FileOrganizerHandler.FILE_CATEGORIES)
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "cat.gif")), "Unsorted")
+
+    def test_size_and_age_rules(self):
+        rules = RuleSet([
+            {"category": "Large", "extensions": [".bin"], "min_size": 100},
+            {"category": "Old", "extensions": [".bin"], "min_age_days": 30},
+        ])
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "big.bin"), b"x" * 100)), "Large")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "old.bin"), age=31 * 86400)), "Old")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "new.bin"))), "Others")
+        # Stat rules can't match a file that's gone
+        self.assertEqual(rules.classify(os.path.join(self.tmp, "gone.bin")), "Others")
+
+    def test_magic_rules(self):
+        rules = RuleSet([
+            {"category": "Documents", "extensions": [""], "magic": "%PDF"},
+            {"category": "Images", "extensions": [""], "magic": ["hex:89504e47", "GIF8"]},
+            {"category": "Videos", "extensions": [""], "magic": "ftyp", "magic_offset": 4},
+        ])
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "doc"), b"%PDF-1.7")), "Documents")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "png"), b"\x89PNG\r\n")), "Images")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "gif"), b"GIF89a")), "Images")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "mp4"), b"\0\0\0\x20ftypisom")), "Videos")
+        self.assertEqual(rules.classify(write_file(os.path.join(self.tmp, "text"), b"hello")), "Others")
+
+    def test_magic_past_header_is_refused(self):
+        with self.assertRaises(ValueError):
+            RuleSet([{"category": "Far", "magic": "abc", "magic_offset": 63}])
+
+    def write_config(self, path, config, version):
+        # Each version gets its own mtime, so the change is seen even within the clock's resolution
+        with open(path, "w") as f:
+            json.dump(config, f)
+        os.utime(path, ns=(version * 10**9, version * 10**9))
+
+    def test_engine_reloads_changed_config(self):
+        path = os.path.join(self.tmp, "rules.json")
+        self.write_config(path, {"rules": [{"category": "Logs", "extensions": [".log"]}]}, 1)
+        engine = RuleEngine(path, builtin=FileOrganizerHandler.FILE_CATEGORIES, reload_interval=0)
+        self.assertEqual(engine.classify("app.log"), "Logs")
+
+        self.write_config(path, {"rules": [{"category": "Journals", "extensions": [".log"]}]}, 2)
+        self.assertEqual(engine.classify("app.log"), "Journals")
+        self.assertIn("Journals", engine.categories)
+
+    def test_broken_config_keeps_previous_rules(self):
+        path = os.path.join(self.tmp, "rules.json")
+        self.write_config(path, {"rules": [{"category": "Logs", "extensions": [".log"]}]}, 1)
+        engine = RuleEngine(path, builtin=FileOrganizerHandler.FILE_CATEGORIES, reload_interval=0)
+
+        with open(path, "w") as f:
+            f.write('{"rules": [')
+        os.utime(path, ns=(2 * 10**9, 2 * 10**9))
+        self.assertFalse(engine.reload())
+        self.assertEqual(engine.classify("app.log"), "Logs")
+
+        self.write_config(path, {"rules": [{"magic": "x"}]}, 3)
+        self.assertEqual(engine.classify("app.log"), "Logs")
+
+    def test_missing_config_uses_builtin(self):
+        engine = RuleEngine(os.path.join(self.tmp, "missing.json"), builtin=FileOrganizerHandler.FILE_CATEGORIES)
+        self.assertEqual(engine.classify("cat.gif"), "Images")
+
+
+class TestMetrics(TempDirTestCase):
+
+    def test_snapshot(self):
+        metrics = Metrics()
+        metrics.increment("moved")
+        metrics.increment("moved", 2)
+        for value in [0.002, 0.003, 0.2, 7]:
+            metrics.observe("move_seconds", value)
+        metrics.gauge("queue_depth", lambda: 5)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"], {"moved": 3})
+        self.assertEqual(snapshot["gauges"], {"queue_depth": 5})
+        self.assertGreater(snapshot["rates_per_second"]["moved"], 0)
+
+        histogram = snapshot["histograms"]["move_seconds"]
+        self.assertEqual(histogram["count"], 4)
+        self.assertAlmostEqual(histogram["sum"], 7.205)
+        self.assertEqual(histogram["max"], 7)
+        self.assertEqual(histogram["p50"], 0.005)
+        self.assertEqual(histogram["p99"], 7)
+        self.assertEqual(histogram["buckets"]["0.005"], 2)
+        self.assertEqual(histogram["buckets"]["+Inf"], 4)
+
+        # Recent rates only count what happened since the previous snapshot
+        self.assertEqual(metrics.snapshot()["recent_rates_per_second"]["moved"], 0)
+
+    def test_dump(self):
+        metrics = Metrics()
+        metrics.increment("events")
+        path = os.path.join(self.tmp, "metrics.json")
+
+        metrics.start_dump(path, interval=0.01)
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        metrics.increment("events")
+        metrics.stop_dump(path)
+
+        with open(path) as f:
+            self.assertEqual(json.load(f)["counters"], {"events": 2})
+        self.assertEqual(os.listdir(self.tmp), ["metrics.json"])
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_dry_run(self):
+        report = file_automator.run_benchmark(20, dry_run=True, workers=2, settle_time=0.05, file_size=16, timeout=30)
+
+        self.assertEqual(report["counters"]["classified"], 20)
+        self.assertNotIn("moved", report["counters"])
+        self.assertEqual(report["benchmark"]["files"], 20)
+        self.assertTrue(report["benchmark"]["dry_run"])
+        self.assertGreater(report["benchmark"]["files_per_second"], 0)
+        self.assertEqual(report["histograms"]["event_to_move_seconds"]["count"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,24 +3,205 @@
 #- View spending breakdown by category
 #- Save/load transaction history
 #- Monthly budget alerts
+#- Optional SQLite storage for large histories (FINANCE_STORAGE=sqlite)
 
+import os
 import json
 from datetime import datetime
 
+#DATA_FILE is a snapshot, changes made since are appended to JOURNAL_FILE one line each
 DATA_FILE = "finance_data.json"
+JOURNAL_FILE = "finance_journal.jsonl"
+#Fold the journal into a new snapshot once it grows past this many bytes
+COMPACT_BYTES = 1024 * 1024
 
-def load_data():
+#Set FINANCE_STORAGE=sqlite to keep transactions in DB_FILE instead (migrated from DATA_FILE on first use)
+STORAGE = os.environ.get("FINANCE_STORAGE", "json")
+DB_FILE = "finance_data.db"
+
+def apply_record(data, record):
+    #Apply one journal record to the in-memory data
+    if record["op"] == "add":
+        data["transactions"].append(record["transaction"])
+    elif record["op"] == "budget":
+        data["budget"] = record["budget"]
+    data["journal_seq"] = record["seq"]
+
+def replay_journal(data):
+    #Apply the journal records newer than the snapshot, returns how many were applied
+    #Records up to journal_seq are already in the snapshot (left over if a compaction was interrupted)
+    #A torn last line from a crash mid-append is skipped (load_data then compacts, so nothing is appended onto it)
+    applied = 0
+    try:
+        with open(JOURNAL_FILE, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record["seq"] > data.get("journal_seq", 0):
+                    apply_record(data, record)
+                    applied += 1
+    except FileNotFoundError:
+        pass
+    return applied
+
+def read_data():
+    #The snapshot with the journal replayed onto it, without writing anything
     try:
         with open(DATA_FILE, 'r') as f:
-            return json.load(f)
+            data = json.load(f)
     except FileNotFoundError:
-        return {"transactions": []}  #Start without a budget
+        data = {"transactions": []}  #Start without a budget
+    replay_journal(data)
+    return data
+
+def load_data():
+    data = read_data()
+    #Compact whenever the journal isn't empty: besides folding in the replayed records, this drops
+    #a torn last line, which the next append would otherwise run into and make unreadable
+    if os.path.exists(JOURNAL_FILE) and os.path.getsize(JOURNAL_FILE) > 0:
+        save_data(data)
+    return data
 
 def save_data(data):
-    with open(DATA_FILE, 'w') as f:
+    #Write a snapshot of everything, then start a new journal
+    #The snapshot replaces the old one atomically, so a crash leaves either the old or the new one
+    tmp_file = DATA_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
         json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, DATA_FILE)
+    open(JOURNAL_FILE, 'w').close()
+
+def record_change(data, record):
+    #Apply a change and append it to the journal, O(1) I/O instead of rewriting the whole file
+    record["seq"] = data.get("journal_seq", 0) + 1
+    apply_record(data, record)
+    with open(JOURNAL_FILE, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+        journal_size = f.tell()
+    if journal_size >= COMPACT_BYTES:
+        save_data(data)
+
+def transaction_month(transaction):
+    #"2024-05-17 12:30" -> "2024-05"
+    return str(transaction["date"])[:7]
+
+class JsonStore:
+    #Transactions held in memory, saved as a snapshot plus journal
+
+    def __init__(self):
+        self.data = load_data()
+
+    def add_transaction(self, transaction):
+        record_change(self.data, {"op": "add", "transaction": transaction})
+
+    def set_budget(self, budget):
+        record_change(self.data, {"op": "budget", "budget": budget})
+
+    def get_budget(self):
+        return self.data.get("budget")
+
+    def spending_by_category(self, start_month, end_month):
+        #{category: total} for the months start_month to end_month ("YYYY-MM"), both included
+        categories = {}
+        for t in self.data["transactions"]:
+            if start_month <= transaction_month(t) <= end_month:
+                categories[t["category"]] = categories.get(t["category"], 0) + t["amount"]
+        return categories
+
+    def close(self):
+        save_data(self.data)  #Compact the journal so the next start has nothing to replay
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+-- (month, category) finds and groups a month's rows in index order; amount makes the
+-- summaries index-only, the table itself is never read for them
+CREATE INDEX IF NOT EXISTS idx_transactions_month_category ON transactions (month, category, amount);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
 
-def set_budget(data):
+class SqliteStore:
+    #Transactions in a SQLite database, summaries computed with SQL aggregates
+
+    def __init__(self, path=DB_FILE):
+        import sqlite3
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.migrate_json()
+
+    def _get_setting(self, key):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_setting(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_json(self):
+        #Copy finance_data.json (and its journal) into the database once, the JSON files are left as they are
+        if self._get_setting("migrated_from") is not None:
+            return
+        if os.path.exists(DATA_FILE) or os.path.exists(JOURNAL_FILE):
+            data = read_data()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO transactions (date, month, amount, category, note) VALUES (?, ?, ?, ?, ?)",
+                    ((t["date"], transaction_month(t), t["amount"], t["category"], t.get("note", ""))
+                     for t in data["transactions"]))
+                if "budget" in data:
+                    self._set_setting("budget", str(data["budget"]))
+                self._set_setting("migrated_from", DATA_FILE)
+            print(f"📦 Migrated {len(data['transactions'])} transactions from {DATA_FILE} to {DB_FILE}")
+        else:
+            with self.conn:
+                self._set_setting("migrated_from", "")
+
+    def add_transaction(self, transaction):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO transactions (date, month, amount, category, note) VALUES (?, ?, ?, ?, ?)",
+                (transaction["date"], transaction_month(transaction), transaction["amount"],
+                 transaction["category"], transaction["note"]))
+
+    def set_budget(self, budget):
+        with self.conn:
+            self._set_setting("budget", str(budget))
+
+    def get_budget(self):
+        budget = self._get_setting("budget")
+        return float(budget) if budget is not None else None
+
+    def spending_by_category(self, start_month, end_month):
+        #{category: total} for the months start_month to end_month ("YYYY-MM"), both included
+        rows = self.conn.execute(
+            "SELECT category, SUM(amount) FROM transactions WHERE month BETWEEN ? AND ? GROUP BY category",
+            (start_month, end_month))
+        return dict(rows)
+
+    def close(self):
+        self.conn.close()
+
+def open_store():
+    if STORAGE == "sqlite":
+        return SqliteStore()
+    return JsonStore()
+
+def set_budget(store):
     print("\n💰 Set Monthly Budget")
     while True:
         try:
@@ -28,14 +209,13 @@ def set_budget(data):
             if budget <= 0:
                 print("❌ Budget must be greater than $0")
                 continue
-            data["budget"] = budget
-            save_data(data)
+            store.set_budget(budget)
             print(f"✅ Budget set to ${budget:.2f}")
             break
         except ValueError:
             print("❌ Invalid amount. Please enter a number.")
 
-def add_transaction(data):
+def add_transaction(store):
     print("\n➕ Add Transaction")
     while True:
         try:
@@ -57,30 +237,53 @@ def add_transaction(data):
         "note": note
     }
     
-    data["transactions"].append(transaction)
-    save_data(data)
+    store.add_transaction(transaction)
     print("✅ Transaction added!")
 
-def view_spending(data):
+def ask_months():
+    #Returns (start_month, end_month) as "YYYY-MM", or None for all time
+    this_month = datetime.now().strftime("%Y-%m")
+    while True:
+        answer = input(f"Month (YYYY-MM, YYYY-MM:YYYY-MM for a range, or 'all') [{this_month}]: ").strip()
+        if not answer:
+            return this_month, this_month
+        if answer.lower() == "all":
+            return None
+        try:
+            months = [datetime.strptime(part.strip(), "%Y-%m").strftime("%Y-%m") for part in answer.split(":")]
+        except ValueError:
+            months = []
+        if len(months) == 1:
+            return months[0], months[0]
+        if len(months) == 2 and months[0] <= months[1]:
+            return months[0], months[1]
+        print("❌ Invalid month. Use YYYY-MM or YYYY-MM:YYYY-MM.")
+
+def count_months(start_month, end_month):
+    start_year, start = map(int, start_month.split("-"))
+    end_year, end = map(int, end_month.split("-"))
+    return (end_year - start_year) * 12 + end - start + 1
+
+def view_spending(store):
     print("\n📊 Spending Summary")
+    months = ask_months()
     
     #Calculate totals
-    categories = {}
-    total = 0
-    for t in data["transactions"]:
-        category = t["category"]
-        amount = t["amount"]
-        categories[category] = categories.get(category, 0) + amount
-        total += amount
+    categories = store.spending_by_category(*(months or ("", "9999-99")))
+    total = sum(categories.values())
     
     #Show category breakdown
-    for category, amount in categories.items():
+    for category, amount in sorted(categories.items()):
         print(f"{category}: ${amount:.2f}")
     
-    #Budget status
-    if "budget" in data:
-        remaining = data["budget"] - total
-        print(f"\nTotal: ${total:.2f} | Budget: ${data['budget']:.2f}")
+    #Budget status, the monthly budget times the number of months shown
+    budget = store.get_budget()
+    if months is None and budget is not None:
+        print(f"\nTotal spending: ${total:.2f} (pick a month to compare with your budget)")
+    elif budget is not None:
+        budget *= count_months(*months)
+        remaining = budget - total
+        print(f"\nTotal: ${total:.2f} | Budget: ${budget:.2f}")
         if remaining < 0:
             print(f"⚠️ You're ${abs(remaining):.2f} OVER budget!")
         else:
@@ -90,7 +293,7 @@ def view_spending(data):
 
 #Where the program actually works
 def main():
-    data = load_data()
+    store = open_store()
     
     while True:
         print("\n💵 Personal Finance Tracker")
@@ -102,12 +305,13 @@ def main():
         choice = input("Choose an option: ")
         
         if choice == "1":
-            add_transaction(data)
+            add_transaction(store)
         elif choice == "2":
-            view_spending(data)
+            view_spending(store)
         elif choice == "3":
-            set_budget(data)
+            set_budget(store)
         elif choice == "4":
+            store.close()
             print("Goodbye! 👋")
             break
         else:
@@ -0,0 +1,181 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import finance_tracker as ft
+
+def make_transaction(amount, date="2024-05-17 12:30", category="Food"):
+    return {"date": date, "amount": amount, "category": category, "note": ""}
+
+class FinanceFilesTestCase(unittest.TestCase):
+    #Points the tracker's data files at a temporary directory for each test
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.saved = (ft.DATA_FILE, ft.JOURNAL_FILE, ft.DB_FILE, ft.COMPACT_BYTES)
+        ft.DATA_FILE = os.path.join(self.tmp.name, "finance_data.json")
+        ft.JOURNAL_FILE = os.path.join(self.tmp.name, "finance_journal.jsonl")
+        ft.DB_FILE = os.path.join(self.tmp.name, "finance_data.db")
+
+    def tearDown(self):
+        ft.DATA_FILE, ft.JOURNAL_FILE, ft.DB_FILE, ft.COMPACT_BYTES = self.saved
+
+class TestJournal(FinanceFilesTestCase):
+
+    def test_replay_after_restart(self):
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(5.0)})
+        ft.record_change(data, {"op": "budget", "budget": 300.0})
+
+        data = ft.load_data()
+        self.assertEqual(len(data["transactions"]), 1)
+        self.assertEqual(data["budget"], 300.0)
+
+    def test_append_after_torn_line(self):
+        #Crash mid-append, restart, add again: both complete transactions must survive
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(1.0)})
+        ft.save_data(data)
+        with open(ft.JOURNAL_FILE, 'a') as f:
+            f.write('{"op": "add", "transa')
+
+        data = ft.load_data()
+        self.assertEqual(len(data["transactions"]), 1)
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(2.0)})
+
+        data = ft.load_data()
+        self.assertEqual([t["amount"] for t in data["transactions"]], [1.0, 2.0])
+
+    def test_interrupted_compaction(self):
+        #Snapshot replaced but journal not emptied: its records must not be applied twice
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(1.0)})
+        with open(ft.JOURNAL_FILE) as f:
+            journal = f.read()
+        ft.save_data(data)
+        with open(ft.JOURNAL_FILE, 'w') as f:
+            f.write(journal)
+
+        self.assertEqual(len(ft.load_data()["transactions"]), 1)
+
+    def test_compacts_past_size_limit(self):
+        ft.COMPACT_BYTES = 500
+        data = ft.load_data()
+        for i in range(20):
+            ft.record_change(data, {"op": "add", "transaction": make_transaction(float(i))})
+        self.assertLess(os.path.getsize(ft.JOURNAL_FILE), 500)
+        self.assertEqual(len(ft.load_data()["transactions"]), 20)
+
+    def test_legacy_data_file(self):
+        with open(ft.DATA_FILE, 'w') as f:
+            json.dump({"transactions": [make_transaction(3.0)], "budget": 50.0}, f)
+        data = ft.load_data()
+        self.assertEqual(len(data["transactions"]), 1)
+        self.assertEqual(data["budget"], 50.0)
+
+class TestSqliteStore(FinanceFilesTestCase):
+
+    def open_sqlite(self):
+        store = ft.SqliteStore(ft.DB_FILE)
+        self.addCleanup(store.close)
+        return store
+
+    def add_history(self, store):
+        store.add_transaction(make_transaction(10.0, "2024-04-30 23:59", "Food"))
+        store.add_transaction(make_transaction(5.5, "2024-05-01 00:00", "Food"))
+        store.add_transaction(make_transaction(800.0, "2024-05-02 09:00", "Rent"))
+        store.add_transaction(make_transaction(20.0, "2024-06-15 18:00", "Fun"))
+        store.add_transaction(make_transaction(2.25, "2024-06-20 08:00", "Food"))
+        store.set_budget(1000.0)
+
+    def test_migrates_snapshot_journal_and_budget(self):
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(1.0, "2024-05-01 10:00")})
+        ft.save_data(data)
+        #These two are only in the journal
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(2.0, "2024-05-02 10:00", "Rent")})
+        ft.record_change(data, {"op": "budget", "budget": 400.0})
+
+        files = {}
+        for path in (ft.DATA_FILE, ft.JOURNAL_FILE):
+            with open(path) as f:
+                files[path] = f.read()
+
+        store = self.open_sqlite()
+        self.assertEqual(store.spending_by_category("2024-05", "2024-05"), {"Food": 1.0, "Rent": 2.0})
+        self.assertEqual(store.get_budget(), 400.0)
+
+        #The JSON files are left as they were
+        for path, contents in files.items():
+            with open(path) as f:
+                self.assertEqual(f.read(), contents)
+
+    def test_migrates_only_once(self):
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(1.0)})
+        self.open_sqlite().close()
+
+        #Changes to the JSON files after the migration are not copied again
+        data = ft.load_data()
+        ft.record_change(data, {"op": "add", "transaction": make_transaction(2.0)})
+        store = self.open_sqlite()
+        self.assertEqual(store.spending_by_category("0000-00", "9999-99"), {"Food": 1.0})
+
+    def test_no_json_files_nothing_to_migrate(self):
+        store = self.open_sqlite()
+        self.assertEqual(store.spending_by_category("0000-00", "9999-99"), {})
+        self.assertIsNone(store.get_budget())
+
+    def test_summaries_match_json_store(self):
+        sqlite_store = self.open_sqlite()
+        self.add_history(sqlite_store)
+        json_store = ft.JsonStore()
+        self.add_history(json_store)
+
+        for months in [("2024-04", "2024-04"), ("2024-05", "2024-05"), ("2024-05", "2024-06"),
+                       ("2024-07", "2024-07"), ("", "9999-99")]:
+            with self.subTest(months=months):
+                self.assertEqual(sqlite_store.spending_by_category(*months),
+                                 json_store.spending_by_category(*months))
+        self.assertEqual(json_store.spending_by_category("2024-05", "2024-06"),
+                         {"Food": 7.75, "Rent": 800.0, "Fun": 20.0})
+        self.assertEqual(sqlite_store.get_budget(), json_store.get_budget())
+
+class TestMonths(unittest.TestCase):
+
+    def test_count_months(self):
+        self.assertEqual(ft.count_months("2024-05", "2024-05"), 1)
+        self.assertEqual(ft.count_months("2024-05", "2024-07"), 3)
+        self.assertEqual(ft.count_months("2023-11", "2024-02"), 4)
+
+    def test_budget_scales_with_months(self):
+        store = mock.Mock()
+        store.spending_by_category.return_value = {"Food": 250.0}
+        store.get_budget.return_value = 100.0
+
+        with mock.patch("builtins.input", return_value="2024-05:2024-07"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as out:
+            ft.view_spending(store)
+
+        store.spending_by_category.assert_called_once_with("2024-05", "2024-07")
+        self.assertIn("Budget: $300.00", out.getvalue())
+        self.assertIn("$50.00 remaining", out.getvalue())
+
+    def test_all_time_skips_budget(self):
+        store = mock.Mock()
+        store.spending_by_category.return_value = {"Food": 250.0}
+        store.get_budget.return_value = 100.0
+
+        with mock.patch("builtins.input", return_value="all"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as out:
+            ft.view_spending(store)
+
+        self.assertNotIn("Budget:", out.getvalue())
+        self.assertIn("Total spending: $250.00", out.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()